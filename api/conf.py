@@ -1,8 +1,65 @@
-from os import environ
-import razorpay
+from os import environ, cpu_count
+from functools import lru_cache
 SECRET_KEY=environ.get('SECRET_KEY')
 DB_PASSWORD=environ.get('DB_PASSWORD')
 DB_USERNAME=environ.get('DB_USERNAME')
 RAZORPAY_KEY_ID=environ.get('RAZORPAY_KEY_ID')
 RAZORPAY_KEY_SECRET=environ.get('RAZORPAY_KEY_SECRET')
-client = razorpay.Client(auth=(RAZORPAY_KEY_ID, RAZORPAY_KEY_SECRET))
+# Member ids each worker reserves per round trip to the counters collection
+MEMBER_ID_BLOCK_SIZE=int(environ.get('MEMBER_ID_BLOCK_SIZE', 10))
+# bcrypt cost for new hashes; older hashes are upgraded on their next login
+BCRYPT_ROUNDS=int(environ.get('BCRYPT_ROUNDS', 12))
+# Threads hashing passwords and how many hash/verify calls may be running or queued
+PASSWORD_HASH_WORKERS=int(environ.get('PASSWORD_HASH_WORKERS', cpu_count() or 1))
+PASSWORD_HASH_MAX_PENDING=int(environ.get('PASSWORD_HASH_MAX_PENDING', 64))
+# Image transcoding pool: process workers by default, threads where multiprocessing is unavailable (Vercel)
+IMAGE_POOL=environ.get('IMAGE_POOL', 'thread' if environ.get('VERCEL') else 'process')
+# API worker processes (set by api/serve.py), each of which starts its own image pool; the
+# default splits the cores between them instead of giving every worker a pool of all cores
+WEB_CONCURRENCY=max(1, int(environ.get('WEB_CONCURRENCY') or 1))
+IMAGE_WORKERS=int(environ.get('IMAGE_WORKERS') or max(1, (cpu_count() or 1) // WEB_CONCURRENCY))
+IMAGE_MAX_QUEUED=int(environ.get('IMAGE_MAX_QUEUED', 256))
+# Largest accepted image upload; bigger files are turned away while they are being read
+IMAGE_MAX_UPLOAD_BYTES=int(environ.get('IMAGE_MAX_UPLOAD_BYTES', 20 * 1024 * 1024))
+# Resized image variants, generated on first request and evicted least recently used past the size limit
+IMAGE_CACHE_DIR=environ.get('IMAGE_CACHE_DIR', 'cache/images')
+IMAGE_CACHE_MAX_BYTES=int(environ.get('IMAGE_CACHE_MAX_BYTES', 512 * 1024 * 1024))
+# Where uploaded images are stored: "local" (served by the API) or "s3" (any S3-compatible bucket)
+STORAGE_BACKEND=environ.get('STORAGE_BACKEND', 'local')
+# Converted images wait here until they are handed to the storage backend
+STORAGE_STAGING_DIR=environ.get('STORAGE_STAGING_DIR', 'cache/staging')
+S3_BUCKET=environ.get('S3_BUCKET')
+# e.g. http://localhost:9000 for MinIO; unset for AWS
+S3_ENDPOINT_URL=environ.get('S3_ENDPOINT_URL') or None
+S3_REGION=environ.get('S3_REGION') or None
+S3_ACCESS_KEY_ID=environ.get('S3_ACCESS_KEY_ID') or None
+S3_SECRET_ACCESS_KEY=environ.get('S3_SECRET_ACCESS_KEY') or None
+# CDN or public bucket base url; without it image urls are presigned
+S3_PUBLIC_URL=environ.get('S3_PUBLIC_URL') or None
+S3_PRESIGN_EXPIRES=int(environ.get('S3_PRESIGN_EXPIRES', 3600))
+S3_MULTIPART_THRESHOLD=int(environ.get('S3_MULTIPART_THRESHOLD', 8 * 1024 * 1024))
+# Seconds a user document fetched for an authenticated request is reused, 0 disables
+USER_CACHE_TTL=int(environ.get('USER_CACHE_TTL', 60))
+# Mongo connection pool, per worker process. Unset values keep the driver defaults.
+MONGO_MAX_POOL_SIZE=int(environ.get('MONGO_MAX_POOL_SIZE', 100))
+MONGO_MIN_POOL_SIZE=int(environ.get('MONGO_MIN_POOL_SIZE', 0))
+MONGO_MAX_IDLE_TIME_MS=int(environ['MONGO_MAX_IDLE_TIME_MS']) if environ.get('MONGO_MAX_IDLE_TIME_MS') else None
+MONGO_WAIT_QUEUE_TIMEOUT_MS=int(environ['MONGO_WAIT_QUEUE_TIMEOUT_MS']) if environ.get('MONGO_WAIT_QUEUE_TIMEOUT_MS') else None
+# Comma separated, e.g. "zstd,snappy,zlib"; zstd and snappy need their extra packages
+MONGO_COMPRESSORS=environ.get('MONGO_COMPRESSORS') or None
+# Defer heavy clients and startup work to first use; on by default on Vercel,
+# where every cold start pays for whatever api.main imports and opens
+LAZY_INIT=environ.get('LAZY_INIT', '1' if environ.get('VERCEL') else '0') == '1'
+
+
+@lru_cache(maxsize=None)
+def get_razorpay_client():
+    # razorpay pulls in requests and pkg_resources, so only import it when a payment needs it
+    import razorpay
+    return razorpay.Client(auth=(RAZORPAY_KEY_ID, RAZORPAY_KEY_SECRET))
+
+
+def __getattr__(name):
+    if name == "client":
+        return get_razorpay_client()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
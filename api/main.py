@@ -1,16 +1,43 @@
 import logging
-import uvicorn
+from contextlib import asynccontextmanager
 from fastapi.responses import JSONResponse
-from fastapi import FastAPI, APIRouter, status
+from fastapi import FastAPI, APIRouter, Request, status
 from fastapi.middleware.cors import CORSMiddleware
 import api.routes.login_route as login
 import api.routes.member_route as member 
 import api.routes.event_route as event
 import api.routes.subscription_routes as subscription
+import api.routes.admin_route as admin
+import api.routes.media_route as media
+import api.routes.events.photo.photos_route as photos
+from api.conf import LAZY_INIT
+from api.utils.db import get_client, close_client
+from api.utils.indexes import ensure_indexes, ensure_indexes_once
+from api.services.member_search_index import member_search_index
+from api.services.image_pipeline import image_pipeline
+from api.services.image_store import STORES
+from api.services.password_hasher import password_hasher
 from fastapi.staticfiles import StaticFiles
 
 
-app = FastAPI()
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # One pool per worker process, opened here and closed on shutdown. In lazy
+    # mode it opens on the first query, indexes are synced before the first
+    # request that may query (see below) and the search index starts on the
+    # first text search.
+    if not LAZY_INIT:
+        get_client()
+        await ensure_indexes()
+        member_search_index.start()
+    yield
+    await member_search_index.stop()
+    password_hasher.shutdown()
+    image_pipeline.shutdown()
+    await close_client()
+
+
+app = FastAPI(lifespan=lifespan)
 
 version_router = APIRouter()
 
@@ -18,6 +45,9 @@ version_router.include_router(login.router, tags=["login"])
 version_router.include_router(member.router, tags=["member"])
 version_router.include_router(event.router, tags=["event"])
 version_router.include_router(subscription.router, tags=["subscription"])
+version_router.include_router(admin.router, tags=["admin"])
+version_router.include_router(media.router, tags=["media"])
+version_router.include_router(photos.router, tags=["photos"])
 app.include_router(version_router)
 
 app.add_middleware(
@@ -27,14 +57,41 @@ app.add_middleware(
     allow_headers=["*"],
     allow_credentials=True,
 )
+# Paths that never query Mongo, a cold start serving them does not sync indexes
+NO_DB_PATHS = ("/static/", "/images/", "/media/", "/docs", "/openapi.json")
+
+if LAZY_INIT:
+    @app.middleware("http")
+    async def sync_indexes_on_first_request(request: Request, call_next):
+        path = request.url.path
+        if path != "/" and not path.startswith(NO_DB_PATHS):
+            await ensure_indexes_once()
+        return await call_next(request)
+
 @app.get("/")
 async def ping():
     return JSONResponse(content={"status": "success", "message": "Pong!"}, status_code=200)
 
 
 app.mount("/static", StaticFiles(directory="static"), name="static")
+class UploadedFiles(StaticFiles):
+    """StaticFiles over a directory that only exists after the first upload, a 404 until then"""
+
+    async def check_config(self) -> None:
+        # StaticFiles raises on every request while the directory is missing; lookups of
+        # missing files already answer 404
+        pass
+
+
+# Gallery photos; include_router drops mounts, so this lives on the app. With a bucket backend
+# images never pass through the API.
+if STORES["photos"].local:
+    app.mount("/images", UploadedFiles(directory=str(STORES["photos"].directory), check_dir=False), name="images")
 
 if __name__ == "__main__":
+    import uvicorn
+
+    # Development server with auto-reload; in production use `python -m api.serve`
     uvicorn.run("main:app", host="0.0.0.0", port=8001, reload=True)
 
 
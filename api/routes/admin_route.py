@@ -0,0 +1,37 @@
+from fastapi import APIRouter, Depends
+from api.services.login_service import token_cache, user_cache, verify_token
+from api.services.image_variants import variant_cache
+from api.services.password_hasher import password_hasher
+from api.utils.cache import cache
+from api.utils.db import pool_options
+from api.utils.indexes import ensure_indexes, index_report
+from api.utils.pool_monitor import pool_monitor
+
+router = APIRouter()
+
+
+@router.get("/admin/indexes", response_model=dict)
+async def get_index_report(user=Depends(verify_token)):
+    return {"indexes": await index_report()}
+
+
+@router.post("/admin/indexes/sync", response_model=dict)
+async def sync_indexes(user=Depends(verify_token)):
+    await ensure_indexes()
+    return {"message": "Indexes synced", "indexes": await index_report()}
+
+
+@router.get("/admin/cache", response_model=dict)
+async def get_cache_stats(user=Depends(verify_token)):
+    return {
+        "cache": cache.stats(),
+        "tokens": token_cache.stats(),
+        "users": user_cache.stats(),
+        "password_hasher": password_hasher.stats(),
+        "image_variants": variant_cache.stats(),
+    }
+
+
+@router.get("/admin/db-pool", response_model=dict)
+async def get_db_pool_stats(user=Depends(verify_token)):
+    return {"options": pool_options(), "pool": pool_monitor.stats()}
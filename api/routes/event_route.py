@@ -1,11 +1,12 @@
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, HTTPException, Request
 from api.request_model import EventCreate
 from api.utils.db import events_collection
+from api.utils.cache import EVENTS_KEY, cache
+from api.utils.etag import conditional_json, mark_changed
 from bson.objectid import ObjectId
 from fastapi import UploadFile, File, Form
-import shutil
-import os
-from uuid import uuid4
+from api.services.image_store import image_url, save_upload
+from api.services.image_variants import variant_map
 router = APIRouter()
 
 @router.post("/create_event")
@@ -17,13 +18,11 @@ async def create_event(
     category: str = Form(...),
     image: UploadFile = File(...)
 ):
-    # Save image to a folder
-    extension = os.path.splitext(image.filename)[1]
-    image_filename = f"{uuid4().hex}{extension}"
-    image_path = f"static/images/{image_filename}"
-
-    with open(image_path, "wb") as buffer:
-        shutil.copyfileobj(image.file, buffer)
+    # Convert straight from the upload buffer into the images folder, as WebP like gallery photos;
+    # a poster that was uploaded before reuses the stored file
+    image_filename, _ = await save_upload(image, "events")
+    if image_filename is None:
+        raise HTTPException(status_code=400, detail="Image could not be read.")
 
     event_data = {
         "title": title,
@@ -34,13 +33,14 @@ async def create_event(
         "image": image_filename
     }
 
-    inserted_event = events_collection.insert_one(event_data)
+    inserted_event = await events_collection.insert_one(event_data)
+    cache.invalidate_prefix(EVENTS_KEY)
+    await mark_changed("events")
     return {"message": "Event created successfully", "event_id": str(inserted_event.inserted_id)}
 
-@router.get("/all_events")
-async def get_all_events():
+async def _load_events():
     events = []
-    for event in events_collection.find():
+    async for event in events_collection.find():
         events.append({
             "id": str(event["_id"]),
             "title": event["title"],
@@ -48,6 +48,13 @@ async def get_all_events():
             "date_time": event["date_time"],
             "location": event["location"],
             "category": event.get("category", "Gathering"),
-            "image": event.get("image", "")  # safely get image field if it exists
+            "image": event.get("image", ""),  # safely get image field if it exists
+            "image_url": image_url("events", event.get("image", "")),
+            # Same variants/srcset keys as the gallery photos list
+            **variant_map("events", event.get("image", ""))
         })
     return {"events": events}
+
+@router.get("/all_events")
+async def get_all_events(request: Request):
+    return await conditional_json(request, "events", lambda etag: cache.get_or_load(f"{EVENTS_KEY}:{etag}", _load_events))
@@ -14,5 +14,5 @@ class NewsCreateRequest(BaseModel):
 @router.post("/create_news")
 async def create_event(news: NewsCreateRequest):
     event_data = news.model_dump()
-    inserted_event = news_collection.insert_one(event_data)
+    inserted_event = await news_collection.insert_one(event_data)
     return {"message": "Event created successfully", "event_id": str(inserted_event.inserted_id)}
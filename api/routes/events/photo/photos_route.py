@@ -1,60 +1,47 @@
-from fastapi import FastAPI, File, UploadFile, HTTPException, APIRouter
+from fastapi import FastAPI, File, UploadFile, HTTPException, APIRouter, Request, Depends
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import JSONResponse
-from fastapi.staticfiles import StaticFiles
 from typing import List, Optional
-from PIL import Image
 from pathlib import Path
-import shutil
-import uuid
+from datetime import datetime, timezone
 import asyncio
-from concurrent.futures import ThreadPoolExecutor
+from pymongo.errors import BulkWriteError, PyMongoError
+from api.services.image_store import STORES, image_url, save_upload
+from api.services.image_variants import variant_map
+from api.services.login_service import verify_token
 from api.utils.db import photos_collection
+from api.utils.cache import PHOTOS_PREFIX, cache
+from api.utils.etag import conditional_json, mark_changed
 
 router = APIRouter()
 
-UPLOAD_DIR = Path("uploads")
-OUTPUT_DIR = Path("public/images")
-UPLOAD_DIR.mkdir(parents=True, exist_ok=True)
-OUTPUT_DIR.mkdir(parents=True, exist_ok=True)
+PHOTO_STORE = STORES["photos"]
 
-# ✅ Synchronous conversion function
-def convert_and_save_image(file_path: Path, output_path: Path):
+# ✅ Save to MongoDB, one round trip for the whole upload
+async def save_images_to_db(urls: List[str]) -> List[bool]:
+    """Insert one photo document per url; returns which of them were saved"""
+    now = datetime.now(timezone.utc)
+    saved = [True] * len(urls)
     try:
-        with Image.open(file_path) as img:
-            # Convert to RGB if needed (handles RGBA, etc.)
-            if img.mode in ('RGBA', 'LA', 'P'):
-                img = img.convert('RGB')
-            img.save(output_path, "webp", quality=85, optimize=True)
-        
-        # Delete original temp file
-        if file_path.exists():
-            file_path.unlink()
-        return True
-    except Exception as e:
-        print(f"Error converting image: {e}")
-        # Clean up temp file if conversion fails
-        if file_path.exists():
-            file_path.unlink()
-        return False
-
-# ✅ Save to MongoDB
-def save_image_to_db(url: str):
-    try:
-        photos_collection.insert_one({"url": url})
-        return True
-    except Exception as e:
+        await photos_collection.insert_many([{"url": url, "created_at": now} for url in urls], ordered=False)
+    except BulkWriteError as e:
+        print(f"Error saving to DB: {e.details.get('writeErrors')}")
+        for error in e.details.get("writeErrors", []):
+            saved[error["index"]] = False
+    except PyMongoError as e:
         print(f"Error saving to DB: {e}")
-        return False
+        saved = [False] * len(urls)
+    return saved
 
 # ✅ Main upload route with concurrent processing
 @router.post("/upload-images")
-async def upload_images(files: List[UploadFile] = File(...)):
+async def upload_images(files: List[UploadFile] = File(...), user=Depends(verify_token)):
     urls = []
+    duplicates = []
     failed_files = []
-    temp_files = []
+    pending = []
     
-    # Step 1: Save all uploaded files temporarily and validate
+    # Step 1: Validate; the uploads stay in their spooled buffers until converted
     for file in files:
         try:
             # Validate file type
@@ -62,98 +49,103 @@ async def upload_images(files: List[UploadFile] = File(...)):
                 failed_files.append(f"{file.filename}: Not an image file")
                 continue
             
-            # Generate unique filename
-            temp_uuid = str(uuid.uuid4())
-            temp_path = UPLOAD_DIR / f"{temp_uuid}.tmp"
-            output_path = OUTPUT_DIR / f"{temp_uuid}.webp"
-            
-            # Save uploaded file to temp location
-            with open(temp_path, "wb") as buffer:
-                shutil.copyfileobj(file.file, buffer)
-            
             # Store file info for processing
-            temp_files.append({
-                'temp_path': temp_path,
-                'output_path': output_path,
-                'url': f"/images/{temp_uuid}.webp",
+            pending.append({
+                'upload': file,
                 'original_name': file.filename
             })
             
         except Exception as e:
             failed_files.append(f"{file.filename}: Upload error - {str(e)}")
     
-    # Step 2: Convert all images concurrently
-    if temp_files:
-        with ThreadPoolExecutor() as executor:
-            loop = asyncio.get_event_loop()
-            
-            # Create conversion tasks
-            conversion_tasks = [
-                loop.run_in_executor(
-                    executor, 
-                    convert_and_save_image, 
-                    file_info['temp_path'], 
-                    file_info['output_path']
-                )
-                for file_info in temp_files
-            ]
-            
-            # Wait for all conversions to complete
-            results = await asyncio.gather(*conversion_tasks, return_exceptions=True)
-        
-        # Step 3: Process results and save to database
-        for i, result in enumerate(results):
-            file_info = temp_files[i]
-            
-            if result is True:  # Successful conversion
-                # Save to database
-                if save_image_to_db(file_info['url']):
+    # Step 2: Convert all images on the shared pool, which spreads them over the cores;
+    # images stored before are not converted again
+    if pending:
+        conversion_tasks = [save_upload(file_info['upload'], "photos") for file_info in pending]
+        results = await asyncio.gather(*conversion_tasks, return_exceptions=True)
+
+        # Step 3: Process results and save the newly converted ones to database
+        converted = []
+        seen = set()
+        for file_info, result in zip(pending, results):
+            if isinstance(result, tuple) and result[0]:  # Successful conversion
+                filename, already_stored = result
+                file_info['filename'] = filename
+                file_info['url'] = image_url("photos", filename)
+                # Also catches the same image twice in one upload
+                if already_stored or filename in seen:
+                    duplicates.append(file_info['url'])
+                else:
+                    converted.append(file_info)
+                seen.add(filename)
+            else:
+                # Conversion failed or was turned away because the pool is busy
+                if isinstance(result, HTTPException):
+                    error_msg = result.detail
+                else:
+                    error_msg = str(result) if isinstance(result, Exception) else "Conversion failed"
+                failed_files.append(f"{file_info['original_name']}: {error_msg}")
+
+        if converted:
+            # The stored url keeps its old /images/<file> form and doubles as the storage key,
+            # list endpoints resolve it against the configured backend
+            saved = await save_images_to_db([f"/images/{file_info['filename']}" for file_info in converted])
+            for file_info, ok in zip(converted, saved):
+                if ok:
                     urls.append(file_info['url'])
                 else:
                     failed_files.append(f"{file_info['original_name']}: Database save failed")
                     # Clean up file if DB save fails
-                    if file_info['output_path'].exists():
-                        file_info['output_path'].unlink()
-            else:
-                # Conversion failed
-                error_msg = str(result) if isinstance(result, Exception) else "Conversion failed"
-                failed_files.append(f"{file_info['original_name']}: {error_msg}")
+                    await PHOTO_STORE.delete(file_info['filename'])
     
+    if urls:
+        cache.invalidate_prefix(PHOTOS_PREFIX)
+        await mark_changed("photos")
+
     # Step 4: Return response
     response_data = {
-        "message": f"Processed {len(files)} files. {len(urls)} successful, {len(failed_files)} failed.",
+        "message": f"Processed {len(files)} files. {len(urls)} successful, {len(duplicates)} already uploaded, {len(failed_files)} failed.",
         "urls": urls,
         "total_uploaded": len(urls)
     }
+
+    if duplicates:
+        # Existing urls of images that were uploaded before
+        response_data["duplicates"] = duplicates
     
     if failed_files:
         response_data["failed"] = failed_files
     
     return JSONResponse(response_data)
 
-# ✅ Mount static files AFTER defining routes
-router.mount("/images", StaticFiles(directory="public/images"), name="images")
 
+async def _load_images(limit: int):
+    # Get all images from photos collection
+    images_cursor = photos_collection.find({}).sort("_id", -1).limit(limit)
+    
+    images = []
+    async for image in images_cursor:
+        filename = Path(image["url"]).name
+        images.append({
+            "id": str(image["_id"]),
+            "url": image_url("photos", filename),
+            "uploaded_at": image.get("created_at", ""),
+            **variant_map("photos", filename)
+        })
+    return images
 
 @router.get("/api/content/photos")
-async def get_all_images(limit: Optional[int] = 50):
+async def get_all_images(request: Request, limit: Optional[int] = 50):
     try:
-        # Get all images from photos collection
-        images_cursor = photos_collection.find({}).sort("_id", -1).limit(limit)
-        
-        images = []
-        for image in images_cursor:
-            images.append({
-                "id": str(image["_id"]),
-                "url": image["url"],
-                "uploaded_at": image.get("created_at", "")
-            })
+        async def build(etag: str):
+            images = await cache.get_or_load(f"{PHOTOS_PREFIX}{limit}:{etag}", lambda: _load_images(limit))
+            return {
+                "message": "Images fetched successfully",
+                "images": images,
+                "total": len(images)
+            }
 
-        return JSONResponse({
-            "message": "Images fetched successfully",
-            "images": images,
-            "total": len(images)
-        })
+        return await conditional_json(request, "photos", build)
 
     except Exception as e:
         print(f"Error fetching images: {e}")
@@ -1,20 +1,21 @@
 import jwt
 from fastapi import Depends, HTTPException, APIRouter
-from bson.objectid import ObjectId
-from api.conf import SECRET_KEY
-from api.request_model import User, UserCreate, Token
-from api.services.login_service import create_access_token, hash_password, verify_password
-from api.utils.db import users_collection, oauth2_scheme,ALGORITHM
+from api.request_model import RefreshRequest, User, UserCreate, Token
+from api.services.login_service import (
+    decode_token, decode_refresh_token, hash_password, issue_tokens, load_user,
+    revoke_session, rotate_refresh_token, verify_and_update_password
+)
+from api.utils.db import users_collection, oauth2_scheme
 
 router = APIRouter()
 
 @router.post("/signup")
 async def signup(user: UserCreate):
-    existing_user = users_collection.find_one({"email": user.email})
+    existing_user = await users_collection.find_one({"email": user.email})
     if existing_user:
         raise HTTPException(status_code=400, detail="Username already exists")
     
-    hashed_password = hash_password(user.password)
+    hashed_password = await hash_password(user.password)
     user_data = {
         "phone": user.phone,  # Fixed typo in key name
         "fullname": user.fullname,
@@ -22,29 +23,45 @@ async def signup(user: UserCreate):
         "hashed_password": hashed_password
     }
     
-    inserted_user = users_collection.insert_one(user_data)
+    inserted_user = await users_collection.insert_one(user_data)
     return {"message": "User created successfully", "user_id": str(inserted_user.inserted_id)}
 
 @router.post("/login", response_model=Token)  # Changed from User to Token
 async def login(request: User):
-    user = users_collection.find_one({"email": request.email})
-    if not user or not verify_password(request.password, user["hashed_password"]):
+    user = await users_collection.find_one({"email": request.email})
+    if not user:
         raise HTTPException(status_code=400, detail="Invalid credentials")
+    verified, new_hash = await verify_and_update_password(request.password, user["hashed_password"])
+    if not verified:
+        raise HTTPException(status_code=400, detail="Invalid credentials")
+    if new_hash:
+        # Stored hash used other rounds than BCRYPT_ROUNDS, upgrade it now that we have the password
+        await users_collection.update_one({"_id": user["_id"]}, {"$set": {"hashed_password": new_hash}})
     
-    access_token = create_access_token(useremail=request.email, user_id=str(user["_id"]))
-    return {"access_token": access_token, "token_type": "bearer"}
+    return issue_tokens(request.email, str(user["_id"]))
+
+@router.post("/token/refresh", response_model=Token)
+async def refresh_tokens(request: RefreshRequest):
+    return await rotate_refresh_token(request.refresh_token)
+
+@router.post("/logout")
+async def logout(request: RefreshRequest):
+    await revoke_session(decode_refresh_token(request.refresh_token))
+    return {"message": "Logged out"}
 
 @router.get("/protected")
 async def protected_route(token: str = Depends(oauth2_scheme)):
     try:
-        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-        user_id = payload.get("user_id")
-        user = users_collection.find_one({"_id": ObjectId(user_id)})
-        if not user:
-            raise HTTPException(status_code=401, detail="Invalid token")
-        return {"message": f"Welcome, {user['fullname']}!"}  # Changed username to fullname
+        payload = decode_token(token)
     except jwt.ExpiredSignatureError:
         raise HTTPException(status_code=401, detail="Token expired")
     except jwt.InvalidTokenError:
         raise HTTPException(status_code=401, detail="Invalid token")
+    if payload.get("type") == "refresh":
+        raise HTTPException(status_code=401, detail="Invalid token")
+
+    user = await load_user(payload.get("user_id"))
+    if not user:
+        raise HTTPException(status_code=401, detail="Invalid token")
+    return {"message": f"Welcome, {user['fullname']}!"}  # Changed username to fullname
     
\ No newline at end of file
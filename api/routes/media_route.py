@@ -0,0 +1,43 @@
+from fastapi import APIRouter, HTTPException
+from fastapi.responses import FileResponse, RedirectResponse
+from api.services.image_store import STORES
+from api.services.image_variants import SOURCE_NAME, VARIANTS, variant_cache
+
+router = APIRouter()
+
+# Variant urls are derived from immutable sources, so clients and CDNs may keep them forever
+IMMUTABLE = "public, max-age=31536000, immutable"
+# Redirects may point at presigned urls, which expire
+REDIRECT_MAX_AGE = "public, max-age=300"
+# The stored image itself, for backends whose own urls expire
+ORIGINAL = "original"
+
+
+@router.get("/media/{store}/{variant}/{filename}")
+async def get_image_variant(store: str, variant: str, filename: str):
+    if store not in STORES or (variant not in VARIANTS and variant != ORIGINAL) or not SOURCE_NAME.match(filename):
+        raise HTTPException(status_code=404, detail="Image not found")
+
+    storage = STORES[store]
+    if variant == ORIGINAL:
+        if storage.local:
+            if not await storage.exists(filename):
+                raise HTTPException(status_code=404, detail="Image not found")
+            return FileResponse(storage.local_path(filename), headers={"Cache-Control": IMMUTABLE})
+        # No HEAD request here, the bucket answers for a missing key itself
+        return RedirectResponse(storage.url(filename), status_code=307, headers={"Cache-Control": REDIRECT_MAX_AGE})
+
+    if not storage.local:
+        # The bucket serves the bytes, the API only decides which object
+        url = await variant_cache.get_url(storage, store, filename, VARIANTS[variant])
+        if url is None:
+            raise HTTPException(status_code=404, detail="Image not found")
+        return RedirectResponse(url, status_code=307, headers={"Cache-Control": REDIRECT_MAX_AGE})
+
+    if not await storage.exists(filename):
+        raise HTTPException(status_code=404, detail="Image not found")
+
+    path = await variant_cache.get(storage, store, filename, VARIANTS[variant])
+    if path is None:
+        raise HTTPException(status_code=422, detail="Image could not be resized")
+    return FileResponse(path, media_type="image/webp", headers={"Cache-Control": IMMUTABLE})
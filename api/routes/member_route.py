@@ -1,23 +1,29 @@
 from bson import ObjectId
 from fastapi import Depends, HTTPException, APIRouter, Body, Path,Query
 from pydantic import BaseModel
-from typing import Optional
+from pymongo.errors import DuplicateKeyError
+from typing import List, Optional
 from api.model.member_model import Member, MemberUpdate, NonMember
+from api.services.id_allocator import member_ids
 from api.utils.db import members_collection, non_members_collection
+from api.utils.etag import conditional_json, mark_changed
+from api.utils.cache import MEMBER_TOTALS_PREFIX, cache, invalidate_member, member_key
+from api.utils.pagination import DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE, fetch_page, page_cursor, parse_fields
 
 router = APIRouter()
 
+# Fresh ids tried by /register_new_user_request before giving up
+MAX_ID_ATTEMPTS = 3
+
 
 class PhoneLookup(BaseModel):
     phone: str
 
 
-MEMBER_ID_COUNTER = 1340
-
 @router.post("/register_member", response_model=dict)
 async def register_member(member: Member):
     # Check for duplicate ID or email
-    if members_collection.find_one({"$or": [{"id": member.id}, {"email": member.email}]}):
+    if await members_collection.find_one({"$or": [{"id": member.id}, {"email": member.email}]}):
         raise HTTPException(status_code=400, detail="Member with this ID or email already exists.")
     
     # Generate a new ID and make sure it's a string
@@ -26,28 +32,36 @@ async def register_member(member: Member):
     # MEMBER_ID_COUNTER += 1
 
     # Insert into collection
-    result = members_collection.insert_one(member.model_dump())
+    result = await members_collection.insert_one(member.model_dump())
+    invalidate_member(member.id)
+    await mark_changed("members")
     return {"message": "Member registered successfully", "member_id": str(result.inserted_id)}
 
 @router.post("/register_new_user_request", response_model=dict)
 async def register_member(member: Member):
     # Check for duplicate ID or email
-    if members_collection.find_one({"$or": [{"phone": member.phone}, {"email": member.email}]}):
+    if await members_collection.find_one({"$or": [{"phone": member.phone}, {"email": member.email}]}):
         raise HTTPException(status_code=400, detail="Member with this ID or email already exists.")
     
-    # Generate a new ID and make sure it's a string
-    global MEMBER_ID_COUNTER
-    member.id = str(MEMBER_ID_COUNTER)
-    MEMBER_ID_COUNTER += 1
-
-    # Insert into collection
-    result = members_collection.insert_one(member.model_dump())
+    # Generate a new ID and make sure it's a string; an id taken outside the counter
+    # (explicit ids, imports) fails on the unique index, so move past it and try again
+    for attempt in range(MAX_ID_ATTEMPTS):
+        member.id = str(await member_ids.next_id())
+        try:
+            result = await members_collection.insert_one(member.model_dump())
+            break
+        except DuplicateKeyError:
+            if attempt == MAX_ID_ATTEMPTS - 1:
+                raise HTTPException(status_code=409, detail="Could not allocate a member ID, try again.")
+            await member_ids.reseed()
+    invalidate_member(member.id)
+    await mark_changed("members")
     return {"message": "Member registered successfully", "member_id": str(result.inserted_id)}
 
 @router.post("/member/phone", response_model=dict)
 async def get_member_by_phone_body(payload: PhoneLookup = Body(...)):
     phone = payload.phone
-    member = members_collection.find_one({
+    member = await members_collection.find_one({
         "phone": phone,
         "member_true": True  # Ensure this condition is met
     })
@@ -152,25 +166,32 @@ async def get_member_by_phone_body(payload: PhoneLookup = Body(...)):
 
 @router.delete("/member/delete/{id}", response_model=dict)
 async def delete_member(id: str = Path(...)):
-    result = members_collection.delete_one({"id": id})
+    result = await members_collection.delete_one({"id": id})
     
     if result.deleted_count == 0:
         raise HTTPException(status_code=404, detail=f"Member with id '{id}' not found.")
     
+    invalidate_member(id)
+    await mark_changed("members")
     return {"message": f"Member with id '{id}' deleted successfully."}
 
 
+async def _load_member(id: str) -> Optional[dict]:
+    member = await members_collection.find_one({"id": id})
+    
+    # Convert ObjectId to string for JSON serialization
+    if member and "_id" in member:
+        member["_id"] = str(member["_id"])
+    
+    return member
+
 @router.get("/member/{id}", response_model=dict)
 async def get_member_by_id(id: str = Path(...)):
-    member = members_collection.find_one({"id": id})
+    member = await cache.get_or_load(member_key(id), lambda: _load_member(id))
     
     if not member:
         raise HTTPException(status_code=404, detail=f"Member with id '{id}' not found.")
     
-    # Convert ObjectId to string for JSON serialization
-    if "_id" in member:
-        member["_id"] = str(member["_id"])
-    
     return member
 
 
@@ -215,22 +236,12 @@ async def get_member_by_id(id: str = Path(...)):
 
 
 from fastapi import Request, Depends, HTTPException, status
-from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
-import jwt
-from api.conf import SECRET_KEY
-from utils.db import ALGORITHM
-
-security = HTTPBearer()
-
-async def verify_token(credentials: HTTPAuthorizationCredentials = Depends(security)):
-    try:
-        token = credentials.credentials
-        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-        if not payload.get("sub"):
-            raise HTTPException(status_code=401, detail="Invalid token")
-        return payload
-    except jwt.PyJWTError:
-        raise HTTPException(status_code=401, detail="Invalid token")
+from fastapi.responses import StreamingResponse
+from api.services.export_service import EXPORT_BATCH_SIZE, MEMBER_EXPORT_COLUMNS, stream_csv, stream_ndjson
+from api.services.search_service import compile_member_search, summarize_explain
+from api.services.member_search_index import member_search_index, timed_search
+from api.services.bulk_import_service import MAX_BULK_ROWS, import_members
+from api.services.login_service import verify_token
 
 @router.put("/member/update/{id}", response_model=dict)
 async def update_member(id: str = Path(...), update_payload: MemberUpdate = Body(...), user=Depends(verify_token)):
@@ -239,26 +250,51 @@ async def update_member(id: str = Path(...), update_payload: MemberUpdate = Body
     if not updates:
         raise HTTPException(status_code=400, detail="No fields provided to update.")
 
-    result = members_collection.update_one({"id": id}, {"$set": updates})
+    result = await members_collection.update_one({"id": id}, {"$set": updates})
 
     if result.matched_count == 0:
         raise HTTPException(status_code=404, detail=f"Member with id '{id}' not found.")
 
+    invalidate_member(id)
+    await mark_changed("members")
     return {"message": "Member updated successfully", "updated_fields": list(updates.keys())}
 
+@router.post("/members/bulk", response_model=dict)
+async def bulk_register_members(members: List[dict] = Body(...), user=Depends(verify_token)):
+    if not members:
+        raise HTTPException(status_code=400, detail="No members provided.")
+    if len(members) > MAX_BULK_ROWS:
+        raise HTTPException(status_code=413, detail=f"At most {MAX_BULK_ROWS} members per request.")
+
+    result = await import_members(members)
+
+    if result["inserted"]:
+        invalidate_member()
+        await mark_changed("members")
+    return result
+
 @router.get("/all/members", response_model=dict)
-async def get_all_members(user=Depends(verify_token)):
-    members = []
-    for member in members_collection.find():
-        member["_id"] = str(member["_id"])
-        members.append(member)
-    
-    return {"members": members}
+async def get_all_members(
+    request: Request,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    after: Optional[str] = Query(None, description="next_cursor from the previous page"),
+    fields: Optional[str] = Query(None, description="Comma separated fields to return"),
+    user=Depends(verify_token)
+):
+    async def build(etag: str):
+        members, next_cursor = await fetch_page(members_collection, {}, limit, after, fields)
+        return {"members": members, "next_cursor": next_cursor}
+
+    # Polling dashboards get a 304 while nothing in the collection changed
+    return await conditional_json(request, "members", build)
 
 @router.get("/members/filter", response_model=dict)
 async def filter_members(
     member_true: Optional[bool] = Query(None),
     amount_subscription: Optional[bool] = Query(None),
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    after: Optional[str] = Query(None, description="next_cursor from the previous page"),
+    fields: Optional[str] = Query(None, description="Comma separated fields to return"),
     user=Depends(verify_token)
 ):
     query = {}
@@ -269,47 +305,86 @@ async def filter_members(
     if amount_subscription is not None:
         query["amount_subscription"] = amount_subscription
 
-    filtered_members = []
-    for member in members_collection.find(query):
-        member["_id"] = str(member["_id"])
-        filtered_members.append(member)
+    filtered_members, next_cursor = await fetch_page(members_collection, query, limit, after, fields)
 
-    return {"filtered_members": filtered_members}
+    return {"filtered_members": filtered_members, "next_cursor": next_cursor}
 
 @router.get("/non_members", response_model=dict)
-async def get_non_members(user=Depends(verify_token)):
-    members = []
-    for member in members_collection.find({"member_true": False}):
-        member["_id"] = str(member["_id"])
-        members.append(member)
+async def get_non_members(
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    after: Optional[str] = Query(None, description="next_cursor from the previous page"),
+    fields: Optional[str] = Query(None, description="Comma separated fields to return"),
+    user=Depends(verify_token)
+):
+    members, next_cursor = await fetch_page(members_collection, {"member_true": False}, limit, after, fields)
     
-    return {"members": members}
+    return {"members": members, "next_cursor": next_cursor}
 
-@router.get("/members/search", response_model=dict)
-async def search_members(request: Request, user=Depends(verify_token)):
-    query_params = dict(request.query_params)
+@router.get("/members/text-search", response_model=dict)
+async def text_search_members(
+    q: str = Query(..., min_length=2, description="Partial name, address, area, city or phone"),
+    limit: int = Query(20, ge=1, le=100),
+    user=Depends(verify_token)
+):
+    if not member_search_index.ready:
+        # No-op once running; in lazy-init mode this is what starts it
+        member_search_index.start()
+        raise HTTPException(status_code=503, detail="Search index is still building, try again shortly.")
 
-    if not query_params:
-        raise HTTPException(status_code=400, detail="No search parameters provided.")
+    return timed_search(q, limit)
 
+@router.get("/members/export")
+async def export_members(
+    format: str = Query("ndjson", pattern="^(ndjson|csv)$"),
+    member_true: Optional[bool] = Query(None),
+    fields: Optional[str] = Query(None, description="Comma separated fields to export"),
+    user=Depends(verify_token)
+):
     query = {}
 
-    for key, value in query_params.items():
-        if value.lower() == "true":
-            query[key] = True
-        elif value.lower() == "false":
-            query[key] = False
-        elif value.isdigit():
-            query[key] = int(value)
-        else:
-            query[key] = value
-
-    matched_members = []
-    for member in members_collection.find(query):
-        member["_id"] = str(member["_id"])
-        matched_members.append(member)
+    if member_true is not None:
+        query["member_true"] = member_true
 
-    return {"matched_members": matched_members}
+    projection = parse_fields(fields)
+    # Rows are streamed batch by batch straight off the cursor, nothing is buffered
+    cursor = members_collection.find(query, projection, batch_size=EXPORT_BATCH_SIZE).sort("_id", 1)
+
+    if format == "csv":
+        # _id is always exported, list it once even when it is asked for
+        columns = list(dict.fromkeys(["_id", *projection.keys()])) if projection else MEMBER_EXPORT_COLUMNS
+        return StreamingResponse(
+            stream_csv(cursor, columns),
+            media_type="text/csv",
+            headers={"Content-Disposition": 'attachment; filename="members.csv"'}
+        )
+
+    return StreamingResponse(
+        stream_ndjson(cursor),
+        media_type="application/x-ndjson",
+        headers={"Content-Disposition": 'attachment; filename="members.ndjson"'}
+    )
+
+@router.get("/members/search", response_model=dict)
+async def search_members(
+    request: Request,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    after: Optional[str] = Query(None, description="next_cursor from the previous page"),
+    fields: Optional[str] = Query(None, description="Comma separated fields to return"),
+    debug: bool = Query(False, description="Include an explain() summary of the query plan"),
+    user=Depends(verify_token)
+):
+    # e.g. /members/search?phone=9876543210 or ?member_true=true&year_of_joining__gte=2015
+    query = compile_member_search(request.query_params.multi_items())
+
+    matched_members, next_cursor = await fetch_page(members_collection, query, limit, after, fields)
+    response = {"matched_members": matched_members, "next_cursor": next_cursor}
+
+    if debug:
+        # The page query itself, with its cursor filter and sort
+        explain = await page_cursor(members_collection, query, limit, after, fields).explain()
+        response["explain"] = summarize_explain(explain)
+
+    return response
 
 # @router.delete("/member/delete/{id}", response_model=dict)
 # async def delete_member(id: str = Path(...), user=Depends(verify_token)):
@@ -332,90 +407,152 @@ async def search_members(request: Request, user=Depends(verify_token)):
     
 #     return member
 
+def _as_number(field: str) -> dict:
+    # Imported rows sometimes store amounts as strings, coerce them server-side
+    return {"$convert": {"input": f"${field}", "to": "double", "onError": 0, "onNull": 0}}
+
+
+async def _aggregate_one(pipeline: list, cache_key: str) -> dict:
+    # Totals are cached until the TTL runs out or any member write invalidates them
+    async def load():
+        cursor = await members_collection.aggregate(pipeline)
+        results = await cursor.to_list(1)
+        return results[0] if results else {}
+
+    return await cache.get_or_load(MEMBER_TOTALS_PREFIX + cache_key, load)
+
+
 @router.get("/members/total-paid", response_model=dict)
 async def get_total_amount_paid(user=Depends(verify_token)):
-    members = list(members_collection.find())
-
-    total_paid = 0
-    for member in members:
-        total_paid += float(member.get("amount_paid", 0))
+    totals = await _aggregate_one([
+        {"$project": {"_id": 0, "amount_paid_total": _as_number("amount_paid_total")}},
+        {"$group": {
+            "_id": None,
+            "total_members": {"$sum": 1},
+            "total_amount_paid": {"$sum": "$amount_paid_total"}
+        }}
+    ], "total-paid")
 
-    return {"total_members": len(members), "total_amount_paid": total_paid}
+    return {
+        "total_members": totals.get("total_members", 0),
+        "total_amount_paid": totals.get("total_amount_paid", 0)
+    }
 
 @router.get("/members/no-subscription", response_model=list)
 async def get_members_no_subscription(user=Depends(verify_token)):
-    members = list(members_collection.find({"amount_paid_subscription": 0}))
+    members = await members_collection.find({"amount_paid_subscription": 0}).to_list(None)
     for member in members:
         member["_id"] = str(member["_id"])
     return members
 
 @router.get("/members/no-membership", response_model=list)
 async def get_members_no_membership(user=Depends(verify_token)):
-    members = list(members_collection.find({"amount_paid_registration": 0}))
+    members = await members_collection.find({"amount_paid_registration": 0}).to_list(None)
     for member in members:
         member["_id"] = str(member["_id"])
     return members
 
 @router.get("/members/payment-totals", response_model=dict)
 async def get_payment_totals(user=Depends(verify_token)):
-    members = list(members_collection.find({}))
-    
-    total_registration = 0
-    total_subscription = 0
+    totals = await _aggregate_one([
+        {"$project": {
+            "_id": 0,
+            "amount_paid_registration": _as_number("amount_paid_registration"),
+            "amount_paid_subscription": _as_number("amount_paid_subscription")
+        }},
+        {"$group": {
+            "_id": None,
+            "total_registration": {"$sum": "$amount_paid_registration"},
+            "total_subscription": {"$sum": "$amount_paid_subscription"}
+        }}
+    ], "payment-totals")
 
-    for member in members:
-        total_registration += member.get("amount_paid_registration", 0)
-        total_subscription += member.get("amount_paid_subscription", 0)
+    return {
+        "total_registration": totals.get("total_registration", 0),
+        "total_subscription": totals.get("total_subscription", 0)
+    }
+
+@router.get("/members/payment-breakdown", response_model=dict)
+async def get_payment_breakdown(user=Depends(verify_token)):
+    group_totals = {
+        "members": {"$sum": 1},
+        "total_paid": {"$sum": "$amount_paid_total"},
+        "total_registration": {"$sum": "$amount_paid_registration"},
+        "total_subscription": {"$sum": "$amount_paid_subscription"}
+    }
 
+    breakdown = await _aggregate_one([
+        {"$project": {
+            "_id": 0,
+            "year_of_joining": 1,
+            "amount_subscription": {"$ifNull": ["$amount_subscription", False]},
+            "amount_paid_total": _as_number("amount_paid_total"),
+            "amount_paid_registration": _as_number("amount_paid_registration"),
+            "amount_paid_subscription": _as_number("amount_paid_subscription")
+        }},
+        {"$facet": {
+            "by_year": [
+                {"$group": {"_id": "$year_of_joining", **group_totals}},
+                {"$sort": {"_id": 1}}
+            ],
+            "by_subscription_status": [
+                {"$group": {"_id": "$amount_subscription", **group_totals}},
+                {"$sort": {"_id": 1}}
+            ]
+        }}
+    ], "payment-breakdown")
+
+    # Rows come from the cache, build new dicts instead of mutating them
     return {
-        "total_registration": total_registration,
-        "total_subscription": total_subscription
+        "by_year": [
+            {"year_of_joining": row["_id"], **{k: v for k, v in row.items() if k != "_id"}}
+            for row in breakdown.get("by_year", [])
+        ],
+        "by_subscription_status": [
+            {"amount_subscription": row["_id"], **{k: v for k, v in row.items() if k != "_id"}}
+            for row in breakdown.get("by_subscription_status", [])
+        ]
     }
 
 
 
 @router.post("/register_non_member_request", response_model=dict)
 async def register_non_member(non_member: NonMember):
-    from utils.db import non_members_collection
-    
     # Prevent duplicate requests
-    if non_members_collection.find_one({"$or": [{"phone": non_member.phone}, {"email": non_member.email}]}):
+    if await non_members_collection.find_one({"$or": [{"phone": non_member.phone}, {"email": non_member.email}]}):
         raise HTTPException(status_code=400, detail="Request with this phone/email already exists.")
     
-    result = non_members_collection.insert_one(non_member.model_dump())
+    result = await non_members_collection.insert_one(non_member.model_dump())
     return {"message": "Your Information is submitted successfully. Our team will contact you soon", "request_id": str(result.inserted_id)}
 
 
 @router.post("/approve_non_member/{request_id}", response_model=dict)
 async def approve_non_member(request_id: str, user=Depends(verify_token)):
-    from utils.db import non_members_collection, members_collection
-    
-    non_member = non_members_collection.find_one({"_id": ObjectId(request_id)})
+    non_member = await non_members_collection.find_one({"_id": ObjectId(request_id)})
     
     if not non_member:
         raise HTTPException(status_code=404, detail="Non-member request not found.")
     
     # Ensure they aren’t already in members
-    if members_collection.find_one({"$or": [{"phone": non_member["phone"]}, {"email": non_member["email"]}]}):
+    if await members_collection.find_one({"$or": [{"phone": non_member["phone"]}, {"email": non_member["email"]}]}):
         raise HTTPException(status_code=400, detail="Already exists as a member.")
     
     # Move data into members collection
     non_member["member_true"] = True
-    result = members_collection.insert_one(non_member)
+    result = await members_collection.insert_one(non_member)
+    invalidate_member(non_member.get("id"))
+    await mark_changed("members")
     
     # Delete from non_members collection
-    non_members_collection.delete_one({"_id": ObjectId(request_id)})
+    await non_members_collection.delete_one({"_id": ObjectId(request_id)})
     
     return {"message": "Non-member approved and added as member", "member_id": str(result.inserted_id)}
 
 
 @router.get("/non_member_requests", response_model=dict)
 async def get_non_member_requests(user=Depends(verify_token)):
-    
-    from utils.db import non_members_collection
-    
     requests = []
-    for req in non_members_collection.find():
+    async for req in non_members_collection.find():
         req["_id"] = str(req["_id"])
         requests.append(req)
     
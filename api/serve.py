@@ -0,0 +1,50 @@
+"""
+Production entry point: python -m api.serve
+
+Runs the API under uvicorn with several worker processes. Configuration comes
+from the environment:
+
+    HOST                 bind address (default 0.0.0.0)
+    PORT                 bind port (default 8001)
+    WEB_CONCURRENCY      worker processes (default: one per CPU core)
+    LOG_LEVEL            uvicorn log level (default info)
+    FORWARDED_ALLOW_IPS  proxies trusted for X-Forwarded-* headers (default 127.0.0.1)
+    KEEP_ALIVE           keep-alive timeout in seconds (default 5)
+
+The app is passed as an import string and this module never imports it, so
+the supervisor holds no Mongo or Razorpay client. uvicorn starts every worker
+with the spawn method; each one imports api.main on its own and opens its
+own connection pool in its own process.
+"""
+import os
+import uvicorn
+
+APP = "api.main:app"
+
+
+def worker_count() -> int:
+    configured = os.environ.get("WEB_CONCURRENCY")
+    if configured:
+        return max(1, int(configured))
+    return os.cpu_count() or 1
+
+
+def main():
+    workers = worker_count()
+    # Workers size their own pools (images) from this, so they must see the resolved count
+    os.environ["WEB_CONCURRENCY"] = str(workers)
+    uvicorn.run(
+        APP,
+        host=os.environ.get("HOST", "0.0.0.0"),
+        port=int(os.environ.get("PORT", 8001)),
+        workers=workers,
+        log_level=os.environ.get("LOG_LEVEL", "info"),
+        proxy_headers=True,
+        forwarded_allow_ips=os.environ.get("FORWARDED_ALLOW_IPS", "127.0.0.1"),
+        timeout_keep_alive=int(os.environ.get("KEEP_ALIVE", 5)),
+        reload=False,
+    )
+
+
+if __name__ == "__main__":
+    main()
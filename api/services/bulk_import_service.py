@@ -0,0 +1,85 @@
+from typing import List
+from pydantic import ValidationError
+from pymongo.errors import BulkWriteError
+from api.model.member_model import Member
+from api.utils.db import members_collection
+
+MAX_BULK_ROWS = 1000
+
+# Error types match the categories script.py's failed-records workbook summarises
+VALIDATION_ERROR = "Validation Error"
+UPLOAD_ERROR = "Upload Error"
+
+
+def _failed(index: int, member_id, error_type: str, message: str) -> dict:
+    return {
+        "index": index,
+        "status": "failed",
+        "Member_ID": member_id,
+        "Error_Type": error_type,
+        "Error_Message": message,
+    }
+
+
+def _validation_message(error: ValidationError) -> str:
+    return "; ".join(f"{'.'.join(str(p) for p in e['loc'])}: {e['msg']}" for e in error.errors())
+
+
+async def import_members(rows: List[dict]) -> dict:
+    """
+    Validate, dedupe and insert a batch of members in two round trips:
+    one $in lookup for existing ids/emails and one unordered insert_many.
+    Duplicates follow /register_member: a matching id or email rejects the row.
+    """
+    results = [None] * len(rows)
+    valid = []
+
+    for index, row in enumerate(rows):
+        try:
+            valid.append((index, Member.model_validate(row)))
+        except ValidationError as e:
+            results[index] = _failed(index, row.get("id"), VALIDATION_ERROR, _validation_message(e))
+
+    ids = [member.id for _, member in valid]
+    emails = [member.email for _, member in valid]
+    existing_ids, existing_emails = set(), set()
+    if valid:
+        async for doc in members_collection.find(
+            {"$or": [{"id": {"$in": ids}}, {"email": {"$in": emails}}]},
+            {"_id": 0, "id": 1, "email": 1}
+        ):
+            existing_ids.add(doc.get("id"))
+            existing_emails.add(doc.get("email"))
+
+    to_insert = []
+    for index, member in valid:
+        if member.id in existing_ids or member.email in existing_emails:
+            results[index] = _failed(index, member.id, UPLOAD_ERROR, "Member with this ID or email already exists.")
+            continue
+        # Later rows in the same batch are duplicates of earlier ones too
+        existing_ids.add(member.id)
+        existing_emails.add(member.email)
+        to_insert.append((index, member))
+
+    if to_insert:
+        write_errors = {}
+        try:
+            await members_collection.insert_many([member.model_dump() for _, member in to_insert], ordered=False)
+        except BulkWriteError as e:
+            # Raced with another writer (unique index on id), the rest of the batch still went in
+            write_errors = {error["index"]: error.get("errmsg", "Write error") for error in e.details.get("writeErrors", [])}
+
+        for position, (index, member) in enumerate(to_insert):
+            if position in write_errors:
+                results[index] = _failed(index, member.id, UPLOAD_ERROR, write_errors[position])
+            else:
+                results[index] = {"index": index, "status": "inserted", "Member_ID": member.id}
+
+    inserted = sum(1 for result in results if result["status"] == "inserted")
+    return {
+        "message": f"Processed {len(rows)} members. {inserted} inserted, {len(rows) - inserted} failed.",
+        "total": len(rows),
+        "inserted": inserted,
+        "failed": len(rows) - inserted,
+        "results": results,
+    }
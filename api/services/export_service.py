@@ -0,0 +1,51 @@
+import csv
+import io
+import json
+from typing import AsyncIterator, List
+
+from api.model.member_model import Member
+
+EXPORT_BATCH_SIZE = 500
+# Rows in the first chunk sent, so the download starts as soon as the cursor returns anything
+FIRST_BATCH_SIZE = 1
+
+# Model fields first, then the extra columns the Excel importer stores
+MEMBER_EXPORT_COLUMNS = ["_id", *Member.model_fields.keys(), "area", "city", "res_no", "blood_grp", "remarks"]
+
+
+async def stream_ndjson(cursor, batch_size: int = EXPORT_BATCH_SIZE) -> AsyncIterator[str]:
+    lines = []
+    flush_at = min(FIRST_BATCH_SIZE, batch_size)
+    async for doc in cursor:
+        lines.append(json.dumps(doc, default=str))
+        if len(lines) >= flush_at:
+            yield "\n".join(lines) + "\n"
+            lines = []
+            flush_at = batch_size
+    if lines:
+        yield "\n".join(lines) + "\n"
+
+
+async def stream_csv(cursor, columns: List[str], batch_size: int = EXPORT_BATCH_SIZE) -> AsyncIterator[str]:
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=columns, extrasaction="ignore")
+
+    # Send the header straight away so the download starts before the first batch
+    writer.writeheader()
+    yield buffer.getvalue()
+    buffer.seek(0)
+    buffer.truncate()
+
+    rows = 0
+    flush_at = min(FIRST_BATCH_SIZE, batch_size)
+    async for doc in cursor:
+        writer.writerow({key: "" if doc.get(key) is None else str(doc.get(key)) for key in columns})
+        rows += 1
+        if rows >= flush_at:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+            rows = 0
+            flush_at = batch_size
+    if rows:
+        yield buffer.getvalue()
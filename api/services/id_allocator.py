@@ -0,0 +1,93 @@
+import asyncio
+from typing import Awaitable, Callable, Optional
+from pymongo import ReturnDocument
+from api.conf import MEMBER_ID_BLOCK_SIZE
+from api.utils.db import db, members_collection
+
+# One document per sequence: {"_id": name, "value": last id handed out by any worker}
+counters_collection = db.counters
+
+# Where the old process-local MEMBER_ID_COUNTER started, just past the imported roster
+MEMBER_ID_START = 1340
+
+
+async def highest_member_id() -> Optional[int]:
+    """Largest numeric member id in use; ids are strings and some are not numbers at all"""
+    cursor = await members_collection.aggregate([
+        # At most 18 digits, so every match fits in a long
+        {"$match": {"id": {"$type": "string", "$regex": "^[0-9]{1,18}$"}}},
+        {"$group": {"_id": None, "max": {"$max": {"$toLong": "$id"}}}},
+    ])
+    async for result in cursor:
+        return result["max"]
+    return None
+
+
+class SequenceAllocator:
+    """
+    Cluster-wide sequence backed by a counters document.
+
+    Each worker reserves a block of ids with one atomic $inc and hands them out
+    locally, so ids are unique across workers and restarts at the cost of one
+    round trip per block. Ids left in a block when a worker stops are skipped.
+
+    highest, when given, returns the largest id already in use; the counter
+    is moved past it before the first block, so ids issued before the
+    counter existed (or outside it) are never handed out again.
+    """
+
+    def __init__(self, name: str, start: int, block_size: int = 1,
+                 highest: Optional[Callable[[], Awaitable[Optional[int]]]] = None):
+        self.name = name
+        self.start = start
+        self.block_size = max(1, block_size)
+        self.highest = highest
+        self._next = 0
+        self._end = 0
+        self._seeded = False
+        self._lock = None
+
+    async def _seed(self) -> None:
+        floor = self.start - 1
+        if self.highest is not None:
+            floor = max(floor, (await self.highest()) or floor)
+        # $max only ever moves the counter forward, and creates the document on first use
+        await counters_collection.update_one(
+            {"_id": self.name},
+            {"$max": {"value": floor}},
+            upsert=True
+        )
+        self._seeded = True
+
+    async def reseed(self) -> None:
+        """Drop the local block and catch up with the ids in use, after one turned out to be taken"""
+        if self._lock is None:
+            self._lock = asyncio.Lock()
+        async with self._lock:
+            self._next = self._end
+            self._seeded = False
+
+    async def _reserve_block(self) -> None:
+        if not self._seeded:
+            await self._seed()
+        counter = await counters_collection.find_one_and_update(
+            {"_id": self.name},
+            {"$inc": {"value": self.block_size}},
+            return_document=ReturnDocument.AFTER
+        )
+        self._end = counter["value"] + 1
+        self._next = self._end - self.block_size
+
+    async def next_id(self) -> int:
+        # Created on first use, on Python 3.9 a lock binds to the loop current at construction
+        if self._lock is None:
+            self._lock = asyncio.Lock()
+        async with self._lock:
+            if self._next >= self._end:
+                await self._reserve_block()
+            value = self._next
+            self._next += 1
+            return value
+
+
+member_ids = SequenceAllocator("member_id", MEMBER_ID_START, MEMBER_ID_BLOCK_SIZE, highest=highest_member_id)
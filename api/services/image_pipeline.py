@@ -0,0 +1,118 @@
+import asyncio
+import io
+import multiprocessing
+import os
+from contextlib import asynccontextmanager
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from pathlib import Path
+from typing import Callable, Optional
+from fastapi import HTTPException
+from api.conf import IMAGE_WORKERS, IMAGE_POOL, IMAGE_MAX_QUEUED
+
+WEBP_QUALITY = 85
+
+
+def convert_and_save_image(data: bytes, output_path: Path) -> bool:
+    """Decode uploaded bytes and write them as WebP. Runs in a pool worker, so it stays importable and picklable."""
+    # Imported here so the API process only loads Pillow when a thread pool runs the conversion
+    from PIL import Image
+
+    partial = output_path.with_name(f"{output_path.name}.{os.getpid()}.part")
+    try:
+        with Image.open(io.BytesIO(data)) as img:
+            # Convert to RGB if needed (handles RGBA, etc.)
+            if img.mode in ('RGBA', 'LA', 'P'):
+                img = img.convert('RGB')
+            img.save(partial, "webp", quality=WEBP_QUALITY, optimize=True)
+        # Identical uploads share a file name, whoever finishes last replaces it atomically
+        os.replace(partial, output_path)
+        return True
+    except Exception as e:
+        print(f"Error converting image: {e}")
+        # Don't leave a half-written file behind
+        if partial.exists():
+            partial.unlink()
+        return False
+
+
+class ImagePipeline:
+    """
+    App-wide worker pool for image transcoding.
+
+    Decoding and WebP encoding are CPU bound, so by default they run in worker
+    processes, started once and reused by every upload. The pool is per API
+    process: IMAGE_WORKERS defaults to the cores divided by WEB_CONCURRENCY,
+    so all API workers together use about one encoder per core. At most
+    2 x workers jobs are handed to the pool at a time, the rest wait for a
+    slot (backpressure); once max_queued jobs are waiting new ones get a 503.
+    IMAGE_POOL=thread swaps in threads for hosts without multiprocessing
+    support, such as serverless functions.
+    """
+
+    def __init__(self, workers: int, kind: str = "process", max_queued: int = 256):
+        self.workers = max(1, workers)
+        self.kind = kind
+        self.max_queued = max_queued
+        self.queued = 0
+        self.rejected = 0
+        self._executor: Optional[Executor] = None
+        self._slots: Optional[asyncio.Semaphore] = None
+
+    def _get_executor(self) -> Executor:
+        if self._executor is None:
+            if self.kind == "process":
+                # spawn: a forked child would inherit the event loop and the Mongo client's threads
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.workers, mp_context=multiprocessing.get_context("spawn")
+                )
+            else:
+                self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="images")
+        return self._executor
+
+    @asynccontextmanager
+    async def reserve(self):
+        """Wait for a pool slot; submit() inside the block to run a job without queueing again"""
+        # Created on first use, on Python 3.9 a semaphore binds to the loop current at construction
+        if self._slots is None:
+            self._slots = asyncio.Semaphore(self.workers * 2)
+        if self.queued >= self.max_queued:
+            self.rejected += 1
+            raise HTTPException(
+                status_code=503,
+                detail="Image processing is busy, try again shortly.",
+                headers={"Retry-After": "5"}
+            )
+
+        self.queued += 1
+        try:
+            await self._slots.acquire()
+        finally:
+            self.queued -= 1
+        try:
+            yield
+        finally:
+            self._slots.release()
+
+    async def submit(self, fn: Callable, *args):
+        return await asyncio.get_running_loop().run_in_executor(self._get_executor(), fn, *args)
+
+    async def run(self, fn: Callable, *args):
+        async with self.reserve():
+            return await self.submit(fn, *args)
+
+    def shutdown(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=False)
+            self._executor = None
+
+    def stats(self) -> dict:
+        return {
+            "kind": self.kind,
+            "workers": self.workers,
+            "queued": self.queued,
+            "max_queued": self.max_queued,
+            "rejected": self.rejected,
+        }
+
+
+image_pipeline = ImagePipeline(IMAGE_WORKERS, IMAGE_POOL, IMAGE_MAX_QUEUED)
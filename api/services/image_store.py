@@ -0,0 +1,119 @@
+import hashlib
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from typing import Optional, Tuple
+from uuid import uuid4
+from fastapi import HTTPException, UploadFile
+from pymongo.errors import DuplicateKeyError
+from api.conf import IMAGE_MAX_UPLOAD_BYTES, STORAGE_STAGING_DIR
+from api.services.image_pipeline import convert_and_save_image, image_pipeline
+from api.services.storage import build_storage
+from api.utils.db import image_hashes_collection
+
+# Local directory of each store and the url the API serves it at. With a bucket backend the
+# directories only hold images stored before the switch, see migrate_images.py
+LOCAL_STORES = {
+    "photos": (Path("public/images"), "/images"),
+    "events": (Path("static/images"), "/static/images"),
+}
+STORES = {name: build_storage(name, directory, base_url) for name, (directory, base_url) in LOCAL_STORES.items()}
+STAGING_DIR = Path(STORAGE_STAGING_DIR)
+
+READ_CHUNK_SIZE = 1024 * 1024
+# A hash claimed this long ago without a stored file belongs to an upload that died
+CLAIM_TIMEOUT = timedelta(minutes=5)
+
+
+async def read_and_hash(upload: UploadFile) -> Tuple[bytearray, str]:
+    """Read an upload in chunks, hashing each one as it goes by, so the bytes are only walked once"""
+    await upload.seek(0)
+    digest = hashlib.sha256()
+    data = bytearray()
+    while True:
+        chunk = await upload.read(READ_CHUNK_SIZE)
+        if not chunk:
+            break
+        if len(data) + len(chunk) > IMAGE_MAX_UPLOAD_BYTES:
+            raise HTTPException(status_code=413, detail=f"Image is larger than {IMAGE_MAX_UPLOAD_BYTES} bytes.")
+        digest.update(chunk)
+        data += chunk
+    return data, digest.hexdigest()
+
+
+async def save_upload(upload: UploadFile, store: str) -> Tuple[Optional[str], bool]:
+    """
+    Store an uploaded image as WebP and return (file name, already stored).
+
+    Files are named after the SHA-256 of the uploaded bytes. If the same bytes
+    were stored before, the existing file is returned without transcoding
+    again. The hash record is claimed before converting, so of several
+    concurrent uploads of the same bytes only one reports a new file, even
+    across workers. The file name is None when the upload could not be decoded.
+    """
+    storage = STORES[store]
+    # Only read once a pool slot is free, so a large batch never sits in memory all at once
+    async with image_pipeline.reserve():
+        data, sha256 = await read_and_hash(upload)
+
+        filename = f"{sha256[:32]}.webp"
+        if not await _claim(store, sha256, filename):
+            known = await image_hashes_collection.find_one({"store": store, "sha256": sha256})
+            if known is None:
+                # The claim was released in between, the other upload failed
+                if not await _claim(store, sha256, filename):
+                    return filename, True
+            elif await storage.exists(known["filename"]):
+                return known["filename"], True
+            elif not known.get("stored_at") and known["created_at"].replace(tzinfo=timezone.utc) > \
+                    datetime.now(timezone.utc) - CLAIM_TIMEOUT:
+                # An upload of the same bytes is being converted right now and will create the record
+                return known["filename"], True
+            elif not await _take_over(known):
+                # The stored file is gone or its upload died half way, and another upload beat us to redoing it
+                return known["filename"], True
+
+        # Converted under a unique staging name, then handed to the backend as one finished file
+        STAGING_DIR.mkdir(parents=True, exist_ok=True)
+        staged = STAGING_DIR / f"{uuid4().hex}.webp"
+        if not await image_pipeline.submit(convert_and_save_image, data, staged):
+            await image_hashes_collection.delete_one({"store": store, "sha256": sha256, "stored_at": None})
+            return None, False
+
+    await storage.put_file(staged, filename)
+
+    await image_hashes_collection.update_one(
+        {"store": store, "sha256": sha256},
+        {"$set": {"filename": filename, "stored_at": datetime.now(timezone.utc)}}
+    )
+    return filename, False
+
+
+async def _claim(store: str, sha256: str, filename: str) -> bool:
+    """Insert the hash record; the unique (store, sha256) index lets only one upload of the same bytes win"""
+    try:
+        await image_hashes_collection.insert_one(
+            {"store": store, "sha256": sha256, "filename": filename, "created_at": datetime.now(timezone.utc)}
+        )
+        return True
+    except DuplicateKeyError:
+        return False
+
+
+async def _take_over(known: dict) -> bool:
+    """Claim a record whose file never arrived; matching on created_at lets only one upload win"""
+    result = await image_hashes_collection.update_one(
+        {"_id": known["_id"], "created_at": known["created_at"]},
+        {"$set": {"created_at": datetime.now(timezone.utc), "stored_at": None}}
+    )
+    return result.modified_count == 1
+
+
+def image_url(store: str, filename: str) -> str:
+    if not filename:
+        return ""
+    storage = STORES[store]
+    if not storage.stable_urls:
+        # List bodies are cached and tagged by collection version, a presigned url would expire
+        # under an unchanged ETag; the media route redirects to a fresh one on every request
+        return f"/media/{store}/original/{filename}"
+    return storage.url(filename)
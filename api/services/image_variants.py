@@ -0,0 +1,206 @@
+import asyncio
+import hashlib
+import os
+import re
+from collections import OrderedDict
+from pathlib import Path
+from typing import Awaitable, Callable, Dict, Optional
+from uuid import uuid4
+from api.conf import IMAGE_CACHE_DIR, IMAGE_CACHE_MAX_BYTES
+from api.services.image_pipeline import WEBP_QUALITY, image_pipeline
+from api.services.image_store import STAGING_DIR
+from api.services.storage import LocalStorage, Storage
+
+# Width in pixels of each variant; smaller sources are never upscaled
+VARIANTS = {
+    "thumb": 320,
+    "medium": 960,
+    "full": 1920,
+}
+
+# Names source images may have, anything else is not looked up on disk
+SOURCE_NAME = re.compile(r"^[\w-]+\.\w+$")
+
+
+def make_variant(source: Path, target: Path, width: int) -> bool:
+    """Resize to the given width and write WebP. Runs in a pool worker, so it stays importable and picklable."""
+    from PIL import Image
+
+    partial = target.with_name(f"{target.name}.{os.getpid()}.part")
+    try:
+        with Image.open(source) as img:
+            if img.mode not in ('RGB', 'L'):
+                img = img.convert('RGB')
+            if img.width > width:
+                img.thumbnail((width, img.height), Image.LANCZOS, reducing_gap=3.0)
+            img.save(partial, "webp", quality=WEBP_QUALITY, method=4)
+        # Another worker may be writing the same variant, whoever finishes last wins atomically
+        os.replace(partial, target)
+        return True
+    except Exception as e:
+        print(f"Error creating image variant: {e}")
+        if partial.exists():
+            partial.unlink()
+        return False
+
+
+def variant_key(store: str, filename: str, width: int) -> str:
+    # Stored images are never overwritten (content-hash or uuid names), so the name identifies the content
+    return hashlib.sha256(f"{store}:{filename}:{width}:{WEBP_QUALITY}".encode()).hexdigest()
+
+
+class VariantCache:
+    """
+    Generated variants, addressed by the hash of store, source name and width.
+
+    With local storage they are kept in a disk cache bounded by total size:
+    least recently served files are evicted once it grows past max_bytes, and
+    the index is rebuilt from the directory on first use, so every worker
+    process starts from what is on disk; files another worker writes later
+    are adopted when first served. The index and size are per process, so
+    max_bytes is a per-worker limit and with several API workers the
+    directory can grow to about max_bytes times the worker count.
+
+    With a bucket backend they are uploaded next to the originals under
+    variants/ and served from there; expiring them is left to the bucket's
+    lifecycle rules.
+    """
+
+    def __init__(self, directory: Path, max_bytes: int):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._files: "Optional[OrderedDict[Path, int]]" = None
+        self._pending: Dict[str, asyncio.Future] = {}
+        # Variant keys known to be in the bucket, saves a HEAD request per hit
+        self._uploaded: "OrderedDict[str, None]" = OrderedDict()
+
+    def _index(self) -> "OrderedDict[Path, int]":
+        if self._files is None:
+            self.directory.mkdir(parents=True, exist_ok=True)
+            entries = []
+            for path in self.directory.glob("*/*.webp"):
+                stat = path.stat()
+                entries.append((stat.st_mtime, path, stat.st_size))
+            self._files = OrderedDict((path, size) for _, path, size in sorted(entries, key=lambda e: e[0]))
+            self.size = sum(self._files.values())
+        return self._files
+
+    def path_for(self, key: str) -> Path:
+        return self.directory / key[:2] / f"{key}.webp"
+
+    def _touch(self, path: Path) -> None:
+        files = self._index()
+        files.move_to_end(path)
+        # Keeps the recency across restarts, where the order is rebuilt from mtimes
+        os.utime(path)
+
+    def _add(self, path: Path) -> None:
+        files = self._index()
+        size = path.stat().st_size
+        self.size += size - files.get(path, 0)
+        files[path] = size
+        files.move_to_end(path)
+        while self.size > self.max_bytes and len(files) > 1:
+            oldest, oldest_size = files.popitem(last=False)
+            self.size -= oldest_size
+            self.evictions += 1
+            try:
+                oldest.unlink()
+            except FileNotFoundError:
+                pass
+
+    async def _once(self, key: str, generate: Callable[[], Awaitable[bool]]) -> bool:
+        """Concurrent requests for the same variant share one conversion"""
+        pending = self._pending.get(key)
+        if pending is None:
+            pending = asyncio.ensure_future(generate())
+            self._pending[key] = pending
+            pending.add_done_callback(lambda _: self._pending.pop(key, None))
+        return await asyncio.shield(pending)
+
+    async def get(self, storage: LocalStorage, store: str, filename: str, width: int) -> Optional[Path]:
+        """Local path of the variant, generating it on the image pool the first time"""
+        target = self.path_for(variant_key(store, filename, width))
+        files = self._index()
+        if target.exists():
+            self.hits += 1
+            if target in files:
+                self._touch(target)
+            else:
+                # Generated by another worker since this one built its index
+                self._add(target)
+            return target
+
+        self.misses += 1
+        target.parent.mkdir(parents=True, exist_ok=True)
+        source = storage.local_path(filename)
+        if not await self._once(str(target), lambda: image_pipeline.run(make_variant, source, target, width)):
+            return None
+        # Also corrects the size of an entry whose file another worker evicted
+        self._add(target)
+        return target
+
+    async def get_url(self, storage: Storage, store: str, filename: str, width: int) -> Optional[str]:
+        """URL of the variant in the storage backend, generating and uploading it the first time"""
+        key = f"variants/{variant_key(store, filename, width)}.webp"
+        if key in self._uploaded or await storage.exists(key):
+            self.hits += 1
+            self._remember(key)
+            return storage.url(key)
+
+        self.misses += 1
+        if not await storage.exists(filename):
+            return None
+        if not await self._once(key, lambda: self._upload_variant(storage, filename, key, width)):
+            return None
+        self._remember(key)
+        return storage.url(key)
+
+    async def _upload_variant(self, storage: Storage, filename: str, key: str, width: int) -> bool:
+        STAGING_DIR.mkdir(parents=True, exist_ok=True)
+        source = STAGING_DIR / f"{uuid4().hex}.src"
+        target = STAGING_DIR / f"{uuid4().hex}.webp"
+        try:
+            await storage.fetch(filename, source)
+            if not await image_pipeline.run(make_variant, source, target, width):
+                return False
+            await storage.put_file(target, key)
+            return True
+        finally:
+            for path in (source, target):
+                if path.exists():
+                    path.unlink()
+
+    def _remember(self, key: str) -> None:
+        self._uploaded[key] = None
+        self._uploaded.move_to_end(key)
+        if len(self._uploaded) > 10000:
+            self._uploaded.popitem(last=False)
+
+    def stats(self) -> dict:
+        self._index()
+        return {
+            "backend_variants_known": len(self._uploaded),
+            "files": len(self._files),
+            "size": self.size,
+            "max_bytes": self.max_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+        }
+
+
+variant_cache = VariantCache(Path(IMAGE_CACHE_DIR), IMAGE_CACHE_MAX_BYTES)
+
+
+def variant_map(store: str, filename: str) -> dict:
+    """URL of every variant plus a srcset string, spread into each item of the image list endpoints"""
+    if not filename:
+        return {"variants": {}, "srcset": ""}
+    urls = {name: f"/media/{store}/{name}/{filename}" for name in VARIANTS}
+    srcset = ", ".join(f"{urls[name]} {width}w" for name, width in VARIANTS.items())
+    return {"variants": urls, "srcset": srcset}
@@ -1,21 +1,136 @@
+import hashlib
+import time
 import jwt
-from datetime import datetime, timedelta
-from fastapi import APIRouter
+from bson.errors import InvalidId
+from bson.objectid import ObjectId
+from pymongo.errors import DuplicateKeyError
+from datetime import datetime, timedelta, timezone
+from uuid import uuid4
+from fastapi import APIRouter, Depends, HTTPException
+from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from pydantic import  EmailStr
 from typing import Optional
-from api.conf import SECRET_KEY,DB_PASSWORD,DB_USERNAME
-from api.utils.db import pwd_context,ALGORITHM,ACCESS_TOKEN_EXPIRE_MINUTES
+from api.conf import SECRET_KEY,DB_PASSWORD,DB_USERNAME,USER_CACHE_TTL
+from api.utils.cache import TTLCache
+from api.services.password_hasher import password_hasher
+from api.utils.db import users_collection,revoked_tokens_collection,ALGORITHM,ACCESS_TOKEN_EXPIRE_MINUTES,REFRESH_TOKEN_EXPIRE_DAYS
 router = APIRouter()
+security = HTTPBearer()
 
+# Verified claims keyed by a hash of the token, each kept until the token's own exp
+token_cache = TTLCache(maxsize=4096, ttl=ACCESS_TOKEN_EXPIRE_MINUTES * 60)
+# User documents (without the password hash) for endpoints that need more than the claims
+user_cache = TTLCache(maxsize=1024, ttl=USER_CACHE_TTL)
 
-def hash_password(password: str):
-    return pwd_context.hash(password)
 
-def verify_password(plain_password, hashed_password):
-    return pwd_context.verify(plain_password, hashed_password)
+async def hash_password(password: str):
+    return await password_hasher.hash(password)
+
+async def verify_password(plain_password, hashed_password):
+    return await password_hasher.verify(plain_password, hashed_password)
+
+async def verify_and_update_password(plain_password, hashed_password):
+    return await password_hasher.verify_and_update(plain_password, hashed_password)
 
 def create_access_token(useremail: EmailStr, user_id: str, expires_delta: Optional[timedelta] = None):
     now = datetime.now()
     expire = now + (expires_delta or timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES))
-    payload = {"sub": useremail, "user_id": user_id, "exp": expire}
-    return jwt.encode(payload, SECRET_KEY, algorithm=ALGORITHM)
\ No newline at end of file
+    payload = {"sub": useremail, "user_id": user_id, "type": "access", "exp": expire}
+    return jwt.encode(payload, SECRET_KEY, algorithm=ALGORITHM)
+
+def create_refresh_token(useremail: EmailStr, user_id: str, family: Optional[str] = None):
+    """Single-use token; every token rotated from the same login shares its family"""
+    expire = datetime.now(timezone.utc) + timedelta(days=REFRESH_TOKEN_EXPIRE_DAYS)
+    payload = {
+        "sub": useremail,
+        "user_id": user_id,
+        "type": "refresh",
+        "jti": uuid4().hex,
+        "family": family or uuid4().hex,
+        "exp": expire,
+    }
+    return jwt.encode(payload, SECRET_KEY, algorithm=ALGORITHM)
+
+def issue_tokens(useremail: EmailStr, user_id: str, family: Optional[str] = None) -> dict:
+    return {
+        "access_token": create_access_token(useremail=useremail, user_id=user_id),
+        "refresh_token": create_refresh_token(useremail, user_id, family),
+        "token_type": "bearer",
+    }
+
+def _family_key(family: str) -> str:
+    return f"family:{family}"
+
+def decode_refresh_token(token: str) -> dict:
+    try:
+        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM], options={"require": ["exp", "jti", "family"]})
+    except jwt.PyJWTError:
+        raise HTTPException(status_code=401, detail="Invalid refresh token")
+    if payload.get("type") != "refresh":
+        raise HTTPException(status_code=401, detail="Invalid refresh token")
+    return payload
+
+async def revoke_session(payload: dict) -> None:
+    """Block every refresh token of the login the given one belongs to"""
+    await revoked_tokens_collection.update_one(
+        {"_id": _family_key(payload["family"])},
+        # No token of the family can outlive one issued right now
+        {"$setOnInsert": {"expires_at": datetime.now(timezone.utc) + timedelta(days=REFRESH_TOKEN_EXPIRE_DAYS)}},
+        upsert=True
+    )
+
+async def rotate_refresh_token(token: str) -> dict:
+    """Trade a refresh token for a new pair; no password check and no user lookup"""
+    payload = decode_refresh_token(token)
+    if await revoked_tokens_collection.find_one({"_id": _family_key(payload["family"])}, {"_id": 1}):
+        raise HTTPException(status_code=401, detail="Session has been revoked")
+
+    try:
+        # The unique _id makes using a token atomic, of two concurrent refreshes only one wins
+        await revoked_tokens_collection.insert_one({
+            "_id": payload["jti"],
+            "expires_at": datetime.fromtimestamp(payload["exp"], timezone.utc)
+        })
+    except DuplicateKeyError:
+        # An already rotated token came back, it was leaked or replayed: end the whole session
+        await revoke_session(payload)
+        raise HTTPException(status_code=401, detail="Refresh token already used")
+
+    return issue_tokens(payload["sub"], payload["user_id"], payload["family"])
+
+def decode_token(token: str) -> dict:
+    """jwt.decode with the verified claims remembered until exp; raises jwt.PyJWTError like decode"""
+    key = hashlib.sha256(token.encode()).hexdigest()
+    payload = token_cache.get(key)
+    if payload is None:
+        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+        remaining = payload["exp"] - time.time() if "exp" in payload else None
+        if remaining is None or remaining > 0:
+            token_cache.set(key, payload, remaining)
+    # Callers get their own copy, the cached claims must not change under other requests
+    return dict(payload)
+
+
+async def verify_token(credentials: HTTPAuthorizationCredentials = Depends(security)):
+    try:
+        payload = decode_token(credentials.credentials)
+    except jwt.PyJWTError:
+        raise HTTPException(status_code=401, detail="Invalid token")
+    # Refresh tokens only buy new tokens, they are not accepted as bearer tokens
+    if not payload.get("sub") or payload.get("type") == "refresh":
+        raise HTTPException(status_code=401, detail="Invalid token")
+    return payload
+
+
+async def _fetch_user(user_id: str) -> Optional[dict]:
+    try:
+        object_id = ObjectId(user_id)
+    except (InvalidId, TypeError):
+        return None
+    return await users_collection.find_one({"_id": object_id}, {"hashed_password": 0})
+
+
+async def load_user(user_id: str) -> Optional[dict]:
+    if USER_CACHE_TTL <= 0:
+        return await _fetch_user(user_id)
+    return await user_cache.get_or_load(f"user:{user_id}", lambda: _fetch_user(user_id))
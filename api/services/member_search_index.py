@@ -0,0 +1,200 @@
+import asyncio
+import logging
+import re
+import time
+from collections import Counter
+from typing import Dict, Optional, Set
+from pymongo.errors import PyMongoError
+from api.utils.db import members_collection
+
+logger = logging.getLogger(__name__)
+
+# Field -> ranking weight
+SEARCH_FIELDS = {"name": 3.0, "phone": 2.0, "area": 1.5, "city": 1.5, "address": 1.0}
+# Returned with each hit so the dashboard can render results without another lookup
+STORED_FIELDS = ("id", "name", "phone", "email", "address", "area", "city", "member_true")
+
+MIN_OVERLAP = 0.34  # share of the query's trigrams a member must contain, ~1 typo per short word
+RERANK_CANDIDATES = 200
+# Grams shared by more than this share of members ("koc" when everyone lives in Kochi)
+# carry no signal, they are skipped when collecting candidates and only used for ranking
+COMMON_GRAM_SHARE = 0.1
+RETRY_SECONDS = 30
+
+
+def _normalize(field: str, value) -> str:
+    if value is None:
+        return ""
+    text = str(value).lower()
+    if field == "phone":
+        return re.sub(r"\D", "", text)
+    return " ".join(re.findall(r"\w+", text))
+
+
+def _trigrams(text: str) -> Set[str]:
+    # Words are padded so short words and word boundaries still produce grams
+    grams = set()
+    for word in text.split():
+        padded = f" {word} "
+        grams.update(padded[i:i + 3] for i in range(len(padded) - 2))
+    return grams
+
+
+class MemberSearchIndex:
+    """
+    In-process trigram index over member name, address, area, city and phone.
+
+    Trigram overlap gives substring and typo tolerant matching without a
+    collection scan. The index is built once from Mongo and then kept in sync
+    from the members change stream, opened before the build so no write falls
+    between the two; if change streams are unavailable it falls back to a
+    periodic rebuild.
+    """
+
+    def __init__(self):
+        self._postings: Dict[str, Set[str]] = {}
+        self._field_grams: Dict[str, Dict[str, Set[str]]] = {}
+        self._texts: Dict[str, Dict[str, str]] = {}
+        self._stored: Dict[str, dict] = {}
+        self._task: Optional[asyncio.Task] = None
+        self.ready = False
+
+    def __len__(self):
+        return len(self._stored)
+
+    def _add(self, doc: dict) -> None:
+        key = str(doc["_id"])
+        self._remove(key)
+
+        texts = {field: _normalize(field, doc.get(field)) for field in SEARCH_FIELDS}
+        field_grams = {field: _trigrams(text) for field, text in texts.items() if text}
+        for grams in field_grams.values():
+            for gram in grams:
+                self._postings.setdefault(gram, set()).add(key)
+
+        self._texts[key] = texts
+        self._field_grams[key] = field_grams
+        self._stored[key] = {"_id": key, **{field: doc.get(field) for field in STORED_FIELDS}}
+
+    def _remove(self, key: str) -> None:
+        for grams in self._field_grams.pop(key, {}).values():
+            for gram in grams:
+                postings = self._postings.get(gram)
+                if postings is not None:
+                    postings.discard(key)
+                    if not postings:
+                        del self._postings[gram]
+        self._texts.pop(key, None)
+        self._stored.pop(key, None)
+
+    async def rebuild(self) -> None:
+        fresh = MemberSearchIndex()
+        projection = {field: 1 for field in (*SEARCH_FIELDS, *STORED_FIELDS)}
+        async for doc in members_collection.find({}, projection, batch_size=1000):
+            fresh._add(doc)
+
+        self._postings, self._field_grams = fresh._postings, fresh._field_grams
+        self._texts, self._stored = fresh._texts, fresh._stored
+        self.ready = True
+        logger.info("Member search index built with %d members", len(self))
+
+    def _score(self, key: str, query_grams: Set[str], query_text: str) -> float:
+        field_grams = self._field_grams[key]
+        top_weight = max(SEARCH_FIELDS.values())
+
+        weighted = 0.0
+        for gram in query_grams:
+            weighted += max((SEARCH_FIELDS[field] for field, grams in field_grams.items() if gram in grams), default=0.0)
+        score = weighted / (len(query_grams) * top_weight)
+
+        # Exact substrings (a phone suffix, a full street name) beat fuzzy matches
+        if any(query_text and query_text in text for text in self._texts[key].values()):
+            score += 0.5
+        return score
+
+    def search(self, query: str, limit: int = 20) -> list:
+        query_text = " ".join(_normalize("text", query).split())
+        query_grams = _trigrams(query_text)
+        if not query_grams:
+            return []
+
+        postings = sorted((self._postings.get(gram, set()) for gram in query_grams), key=len)
+        common = max(RERANK_CANDIDATES, int(len(self) * COMMON_GRAM_SHARE))
+        selective = [keys for keys in postings if len(keys) <= common]
+
+        if selective:
+            overlap = Counter()
+            for keys in selective:
+                overlap.update(keys)
+            needed = max(1, int(len(selective) * MIN_OVERLAP + 0.5))
+            candidates = [key for key, count in overlap.most_common(RERANK_CANDIDATES) if count >= needed]
+        else:
+            # Every gram is common: members holding all of them are equally good matches,
+            # stop as soon as there are enough of them
+            candidates = []
+            for key in postings[0]:
+                if all(key in keys for keys in postings[1:]):
+                    candidates.append(key)
+                    if len(candidates) >= RERANK_CANDIDATES:
+                        break
+
+        ranked = sorted(
+            ((self._score(key, query_grams, query_text), key) for key in candidates),
+            reverse=True
+        )
+        return [{**self._stored[key], "score": round(score, 3)} for score, key in ranked[:limit]]
+
+    async def _follow_changes(self) -> None:
+        while True:
+            try:
+                # The stream is opened before the scan, so it starts at an operation time that
+                # precedes it: writes made while the scan runs are replayed afterwards instead of
+                # lost. Replaying a change the scan already saw is harmless, _add replaces.
+                try:
+                    stream = await members_collection.watch(full_document="updateLookup")
+                except PyMongoError:
+                    # Still build the index, the retry below keeps rebuilding it
+                    await self.rebuild()
+                    raise
+                async with stream:
+                    await self.rebuild()
+                    async for change in stream:
+                        operation = change["operationType"]
+                        if operation in ("insert", "update", "replace") and change.get("fullDocument"):
+                            self._add(change["fullDocument"])
+                        elif operation == "delete":
+                            self._remove(str(change["documentKey"]["_id"]))
+                        elif operation in ("drop", "rename", "invalidate"):
+                            break
+            except asyncio.CancelledError:
+                raise
+            except PyMongoError as e:
+                # No change streams (standalone server) or a dropped connection, rebuild periodically
+                logger.warning("Member search index sync interrupted: %s", e)
+                await asyncio.sleep(RETRY_SECONDS)
+
+    def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self._follow_changes())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+
+member_search_index = MemberSearchIndex()
+
+
+def timed_search(query: str, limit: int) -> dict:
+    started = time.perf_counter()
+    results = member_search_index.search(query, limit)
+    return {
+        "matched_members": results,
+        "took_ms": round((time.perf_counter() - started) * 1000, 2),
+        "indexed_members": len(member_search_index),
+    }
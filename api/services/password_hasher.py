@@ -0,0 +1,61 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Optional, Tuple
+from fastapi import HTTPException
+from api.conf import PASSWORD_HASH_WORKERS, PASSWORD_HASH_MAX_PENDING
+from api.utils.db import get_pwd_context
+
+
+class PasswordHasher:
+    """
+    Runs bcrypt on a small dedicated thread pool instead of the event loop.
+
+    bcrypt releases the GIL while it hashes, so threads use several cores and
+    the loop keeps serving other requests during a login burst. At most
+    max_pending hash/verify calls may be running or queued; past that new
+    ones are turned away with a 503 rather than piling up behind the pool.
+    """
+
+    def __init__(self, workers: int, max_pending: int):
+        self.workers = max(1, workers)
+        self.max_pending = max(self.workers, max_pending)
+        self.rejected = 0
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._slots: Optional[asyncio.Semaphore] = None
+
+    async def _run(self, fn: Callable, *args):
+        # Created on first use, on Python 3.9 a semaphore binds to the loop current at construction
+        if self._slots is None:
+            self._slots = asyncio.Semaphore(self.max_pending)
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="bcrypt")
+        if self._slots.locked():
+            self.rejected += 1
+            raise HTTPException(
+                status_code=503,
+                detail="Too many sign-ins in progress, try again shortly.",
+                headers={"Retry-After": "1"}
+            )
+        async with self._slots:
+            return await asyncio.get_running_loop().run_in_executor(self._executor, fn, *args)
+
+    async def hash(self, password: str) -> str:
+        return await self._run(get_pwd_context().hash, password)
+
+    async def verify(self, password: str, hashed_password: str) -> bool:
+        return await self._run(get_pwd_context().verify, password, hashed_password)
+
+    async def verify_and_update(self, password: str, hashed_password: str) -> Tuple[bool, Optional[str]]:
+        """Like verify, plus a new hash when the stored one was made with other rounds"""
+        return await self._run(get_pwd_context().verify_and_update, password, hashed_password)
+
+    def shutdown(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=False)
+            self._executor = None
+
+    def stats(self) -> dict:
+        return {"workers": self.workers, "max_pending": self.max_pending, "rejected": self.rejected}
+
+
+password_hasher = PasswordHasher(PASSWORD_HASH_WORKERS, PASSWORD_HASH_MAX_PENDING)
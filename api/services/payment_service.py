@@ -2,9 +2,12 @@ import datetime
 import hashlib
 import hmac
 from fastapi import HTTPException
+from fastapi.concurrency import run_in_threadpool
 
-from api.conf import RAZORPAY_KEY_ID, RAZORPAY_KEY_SECRET, client
+from api.conf import RAZORPAY_KEY_ID, RAZORPAY_KEY_SECRET, get_razorpay_client
 from api.model.payment_model import OrderRequest, PaymentResponse, PaymentVerification
+from api.utils.cache import invalidate_member
+from api.utils.etag import mark_changed
 from api.utils.db import members_collection
 
 class PaymentService:
@@ -19,7 +22,8 @@ class PaymentService:
         }
         
         # Create order using Razorpay
-        order = client.order.create(data=order_data)
+        # Razorpay's SDK is blocking, keep it off the event loop
+        order = await run_in_threadpool(get_razorpay_client().order.create, data=order_data)
         
         return {
             "order_id": order['id'],
@@ -40,17 +44,20 @@ class PaymentService:
             if generated_signature == payment_data.razorpay_signature:
                 # Payment is verified
                 # Fetch payment details
-                payment_details = client.payment.fetch(payment_data.razorpay_payment_id)
+                payment_details = await run_in_threadpool(get_razorpay_client().payment.fetch, payment_data.razorpay_payment_id)
                 
                 timestamp = datetime.datetime.now().strftime("%b %d, %Y, %H:%M:%S")
                 date = datetime.datetime.now().strftime("%b %d, %Y")
                 time = datetime.datetime.now().strftime("%H:%M:%S")
 
-                result = members_collection.update_one({"id": payment_data.member_id}, {"$inc": {"amount_paid_total": payment_details["amount"] / 100}, "$set": {"amount_subscription": True, "amount_paid_subscription": payment_details['amount'] / 100, "transaction_id": payment_data.razorpay_payment_id, "date_of_subscription": timestamp}})
+                result = await members_collection.update_one({"id": payment_data.member_id}, {"$inc": {"amount_paid_total": payment_details["amount"] / 100}, "$set": {"amount_subscription": True, "amount_paid_subscription": payment_details['amount'] / 100, "transaction_id": payment_data.razorpay_payment_id, "date_of_subscription": timestamp}})
 
                 if result.matched_count == 0:
                     raise HTTPException(status_code=404, detail=f"Member with id '{payment_data.member_id}' not found.")
 
+                invalidate_member(payment_data.member_id)
+                await mark_changed("members")
+
                 # Store payment details in your database here
                 # save_payment_to_database(payment_details)
                 
@@ -0,0 +1,141 @@
+import re
+from typing import Any, List, Optional, Tuple, Union, get_args, get_origin
+from fastapi import HTTPException
+from pydantic import TypeAdapter, ValidationError
+from api.model.member_model import Member
+from api.utils.indexes import REQUIRED_INDEXES
+
+# Query params handled by the endpoint itself, never compiled into the filter
+RESERVED_PARAMS = {"limit", "after", "fields", "debug"}
+
+RANGE_OPERATORS = {"gt": "$gt", "gte": "$gte", "lt": "$lt", "lte": "$lte"}
+OPERATORS = {"eq", "prefix", "in", *RANGE_OPERATORS}
+
+
+def _base_type(annotation):
+    # Optional[X] -> X
+    if get_origin(annotation) is Union:
+        args = [arg for arg in get_args(annotation) if arg is not type(None)]
+        return args[0] if len(args) == 1 else annotation
+    return annotation
+
+
+def _indexed_fields() -> set:
+    """Fields that lead an index, i.e. a predicate on them alone is an index scan"""
+    return {next(iter(index.document["key"])) for index in REQUIRED_INDEXES["members"]}
+
+
+# Fields whose index narrows a search to a few members. member_true and amount_subscription
+# lead indexes too, but on their own they match a large share of the collection.
+SELECTIVE_FIELDS = {"id", "email", "phone", "year_of_joining"}
+
+SEARCHABLE_FIELDS = {name: info.annotation for name, info in Member.model_fields.items()}
+_ADAPTERS = {name: TypeAdapter(annotation) for name, annotation in SEARCHABLE_FIELDS.items()}
+INDEXED_FIELDS = _indexed_fields() & SELECTIVE_FIELDS & set(SEARCHABLE_FIELDS)
+
+
+def _allowed_operators(field: str) -> set:
+    base = _base_type(SEARCHABLE_FIELDS[field])
+    allowed = {"eq", "in"}
+    if base in (int, float):
+        allowed |= set(RANGE_OPERATORS)
+    elif base is not bool:
+        allowed.add("prefix")
+    return allowed
+
+
+def _coerce(field: str, value: str) -> Any:
+    try:
+        return _ADAPTERS[field].validate_python(value)
+    except ValidationError:
+        raise HTTPException(status_code=400, detail=f"Invalid value for '{field}': {value}")
+
+
+def compile_member_search(params: List[Tuple[str, str]]) -> dict:
+    """
+    Compile `field[__op]=value` query params into a Mongo filter.
+
+    Operators: eq (default), prefix (strings), in (comma separated list) and
+    gt/gte/lt/lte (numbers, e.g. year_of_joining). At least one predicate must
+    be on a selective indexed field so the planner never falls back to reading
+    most of the collection; predicates on other fields, member_true included,
+    are then applied as a residual filter.
+    """
+    query = {}
+    used_fields = set()
+
+    for key, value in params:
+        if key in RESERVED_PARAMS:
+            continue
+
+        field, _, op = key.partition("__")
+        op = op or "eq"
+
+        if field not in SEARCHABLE_FIELDS:
+            raise HTTPException(status_code=400, detail=f"Unknown search field '{field}'.")
+        if op not in OPERATORS or op not in _allowed_operators(field):
+            raise HTTPException(status_code=400, detail=f"Operator '{op}' is not supported for '{field}'.")
+
+        if op == "eq":
+            condition = _coerce(field, value)
+        elif op == "in":
+            condition = {"$in": [_coerce(field, item.strip()) for item in value.split(",") if item.strip()]}
+        elif op == "prefix":
+            # Anchored, case-sensitive regex is the only form Mongo turns into an index range
+            condition = {"$regex": f"^{re.escape(value)}"}
+        else:
+            condition = {RANGE_OPERATORS[op]: _coerce(field, value)}
+
+        existing = query.get(field)
+        if isinstance(existing, dict) and isinstance(condition, dict):
+            existing.update(condition)
+        elif field in query:
+            raise HTTPException(status_code=400, detail=f"Conflicting conditions for '{field}'.")
+        else:
+            query[field] = condition
+        used_fields.add(field)
+
+    if not query:
+        raise HTTPException(status_code=400, detail="No search parameters provided.")
+
+    if not used_fields & INDEXED_FIELDS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Search must include at least one indexed field: {', '.join(sorted(INDEXED_FIELDS))}."
+        )
+
+    return query
+
+
+def _collect_stages(plan: dict, stages: list, indexes: list) -> None:
+    stages.append(plan.get("stage"))
+    if plan.get("indexName"):
+        indexes.append(plan["indexName"])
+    for child in [plan.get("inputStage"), *plan.get("inputStages", [])]:
+        if child:
+            _collect_stages(child, stages, indexes)
+
+
+def summarize_explain(explain: dict) -> dict:
+    """Reduce explain() output to what matters when checking a search is index backed"""
+    winning_plan = explain.get("queryPlanner", {}).get("winningPlan", {})
+    # Slot based engine wraps the classic plan under queryPlan
+    winning_plan = winning_plan.get("queryPlan", winning_plan)
+    stages: list = []
+    indexes: list = []
+    _collect_stages(winning_plan, stages, indexes)
+
+    stats: Optional[dict] = explain.get("executionStats")
+    summary = {
+        "stages": stages,
+        "indexes": indexes,
+        "collection_scan": "COLLSCAN" in stages,
+    }
+    if stats:
+        summary.update({
+            "returned": stats.get("nReturned"),
+            "keys_examined": stats.get("totalKeysExamined"),
+            "docs_examined": stats.get("totalDocsExamined"),
+            "time_ms": stats.get("executionTimeMillis"),
+        })
+    return summary
@@ -0,0 +1,177 @@
+"""
+Where stored images live.
+
+LocalStorage keeps files in a directory that the API serves itself through
+StaticFiles. S3Storage puts them in an S3-compatible bucket (AWS, MinIO,
+R2, ...) and hands out CDN or presigned URLs, so image traffic never reaches
+the API process. STORAGE_BACKEND picks one for every image store.
+
+Switching an existing install to s3 leaves the images stored so far on local
+disk; copy them into the bucket with `python migrate_images.py` first.
+"""
+import os
+import shutil
+from abc import ABC, abstractmethod
+from functools import lru_cache
+from pathlib import Path
+from typing import Optional
+from fastapi.concurrency import run_in_threadpool
+from api.conf import (
+    STORAGE_BACKEND, S3_BUCKET, S3_ENDPOINT_URL, S3_REGION, S3_ACCESS_KEY_ID, S3_SECRET_ACCESS_KEY,
+    S3_PUBLIC_URL, S3_PRESIGN_EXPIRES, S3_MULTIPART_THRESHOLD
+)
+
+
+class Storage(ABC):
+    """Key/file store for one kind of image; keys are plain file names, optionally with a folder"""
+
+    # Whether files can be read straight from local_path()
+    local = False
+    # Whether url() stays valid, so it may be cached or stored
+    stable_urls = True
+
+    @abstractmethod
+    async def put_file(self, path: Path, key: str, content_type: str = "image/webp") -> None:
+        """Store a finished local file under key; the local file is consumed"""
+
+    @abstractmethod
+    async def exists(self, key: str) -> bool:
+        ...
+
+    @abstractmethod
+    async def delete(self, key: str) -> None:
+        ...
+
+    @abstractmethod
+    async def fetch(self, key: str, path: Path) -> None:
+        """Copy the stored file to a local path"""
+
+    @abstractmethod
+    def url(self, key: str) -> str:
+        ...
+
+    def local_path(self, key: str) -> Optional[Path]:
+        return None
+
+
+class LocalStorage(Storage):
+    local = True
+
+    def __init__(self, directory: Path, base_url: str):
+        self.directory = directory
+        self.base_url = base_url.rstrip("/")
+        # The directory is created by the first put_file; importing the app never writes to disk,
+        # deploy directories can be read-only
+
+    def local_path(self, key: str) -> Path:
+        return self.directory / key
+
+    async def put_file(self, path: Path, key: str, content_type: str = "image/webp") -> None:
+        target = self.local_path(key)
+        target.parent.mkdir(parents=True, exist_ok=True)
+        # A rename when both are on one filesystem, so readers never see a partial file
+        await run_in_threadpool(shutil.move, str(path), str(target))
+
+    async def exists(self, key: str) -> bool:
+        return self.local_path(key).is_file()
+
+    async def delete(self, key: str) -> None:
+        try:
+            self.local_path(key).unlink()
+        except FileNotFoundError:
+            pass
+
+    async def fetch(self, key: str, path: Path) -> None:
+        await run_in_threadpool(shutil.copyfile, self.local_path(key), path)
+
+    def url(self, key: str) -> str:
+        return f"{self.base_url}/{key}"
+
+
+class S3Storage(Storage):
+    """
+    Bucket-backed store. Files are streamed from disk in chunks and anything
+    above S3_MULTIPART_THRESHOLD goes up as a multipart upload. URLs point at
+    S3_PUBLIC_URL (a CDN or public bucket) when it is set, otherwise they are
+    presigned GETs valid for S3_PRESIGN_EXPIRES seconds.
+
+    Needs boto3 (requirements-s3.txt), which is only imported when this
+    backend is selected.
+    """
+
+    def __init__(self, bucket: str, prefix: str):
+        self.bucket = bucket
+        self.prefix = prefix.strip("/") + "/"
+
+    @property
+    def client(self):
+        return _s3_client()
+
+    @property
+    def stable_urls(self) -> bool:
+        # Presigned urls expire
+        return bool(S3_PUBLIC_URL)
+
+    def _key(self, key: str) -> str:
+        return self.prefix + key
+
+    async def put_file(self, path: Path, key: str, content_type: str = "image/webp") -> None:
+        from boto3.s3.transfer import TransferConfig
+
+        config = TransferConfig(multipart_threshold=S3_MULTIPART_THRESHOLD, multipart_chunksize=S3_MULTIPART_THRESHOLD)
+        extra = {"ContentType": content_type, "CacheControl": "public, max-age=31536000, immutable"}
+        try:
+            await run_in_threadpool(
+                self.client.upload_file, str(path), self.bucket, self._key(key), ExtraArgs=extra, Config=config
+            )
+        finally:
+            os.unlink(path)
+
+    async def exists(self, key: str) -> bool:
+        from botocore.exceptions import ClientError
+
+        try:
+            await run_in_threadpool(self.client.head_object, Bucket=self.bucket, Key=self._key(key))
+            return True
+        except ClientError as e:
+            if e.response.get("Error", {}).get("Code") in ("404", "NoSuchKey", "NotFound"):
+                return False
+            raise
+
+    async def delete(self, key: str) -> None:
+        await run_in_threadpool(self.client.delete_object, Bucket=self.bucket, Key=self._key(key))
+
+    async def fetch(self, key: str, path: Path) -> None:
+        await run_in_threadpool(self.client.download_file, self.bucket, self._key(key), str(path))
+
+    def url(self, key: str) -> str:
+        if S3_PUBLIC_URL:
+            return f"{S3_PUBLIC_URL.rstrip('/')}/{self._key(key)}"
+        return self.client.generate_presigned_url(
+            "get_object", Params={"Bucket": self.bucket, "Key": self._key(key)}, ExpiresIn=S3_PRESIGN_EXPIRES
+        )
+
+
+@lru_cache(maxsize=None)
+def _s3_client():
+    # boto3 clients are thread-safe, one is shared by every store
+    try:
+        import boto3
+    except ImportError:
+        raise RuntimeError("STORAGE_BACKEND=s3 needs boto3, install it with `pip install -r requirements-s3.txt`")
+    return boto3.client(
+        "s3",
+        endpoint_url=S3_ENDPOINT_URL,
+        region_name=S3_REGION,
+        aws_access_key_id=S3_ACCESS_KEY_ID,
+        aws_secret_access_key=S3_SECRET_ACCESS_KEY,
+    )
+
+
+def build_storage(name: str, directory: Path, base_url: str) -> Storage:
+    """Storage for one image store: the given directory locally, or <name>/ in the bucket"""
+    if STORAGE_BACKEND == "s3":
+        if not S3_BUCKET:
+            raise RuntimeError("STORAGE_BACKEND=s3 needs S3_BUCKET")
+        return S3Storage(S3_BUCKET, name)
+    return LocalStorage(directory, base_url)
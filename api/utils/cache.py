@@ -0,0 +1,81 @@
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Optional
+
+
+class TTLCache:
+    """Process-local LRU cache whose entries also expire after a TTL"""
+
+    def __init__(self, maxsize: int = 1024, ttl: float = 60):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data: "OrderedDict[str, tuple]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key: str) -> Any:
+        entry = self._data.get(key)
+        if entry is None or entry[0] < time.monotonic():
+            if entry is not None:
+                del self._data[key]
+            self.misses += 1
+            return None
+        self._data.move_to_end(key)
+        self.hits += 1
+        return entry[1]
+
+    def set(self, key: str, value: Any, ttl: Optional[float] = None) -> None:
+        self._data[key] = (time.monotonic() + (ttl or self.ttl), value)
+        self._data.move_to_end(key)
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+            self.evictions += 1
+
+    def invalidate(self, *keys: str) -> None:
+        for key in keys:
+            self._data.pop(key, None)
+
+    def invalidate_prefix(self, prefix: str) -> None:
+        for key in [key for key in self._data if key.startswith(prefix)]:
+            del self._data[key]
+
+    async def get_or_load(self, key: str, loader: Callable[[], Awaitable[Any]], ttl: Optional[float] = None) -> Any:
+        value = self.get(key)
+        if value is None:
+            value = await loader()
+            # Misses (None) are not cached, a 404 must not outlive the insert that fixes it
+            if value is not None:
+                self.set(key, value, ttl)
+        return value
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self._data),
+            "maxsize": self.maxsize,
+            "ttl": self.ttl,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_ratio": round(self.hits / lookups, 3) if lookups else 0.0,
+        }
+
+
+# Shared by the read-heavy routes; keys are namespaced per resource
+cache = TTLCache(maxsize=2048, ttl=60)
+
+EVENTS_KEY = "events:all"
+MEMBER_TOTALS_PREFIX = "members:totals:"
+PHOTOS_PREFIX = "photos:"
+
+
+def member_key(member_id: str) -> str:
+    return f"member:{member_id}"
+
+
+def invalidate_member(member_id: Optional[str] = None) -> None:
+    """Any member write changes the totals; writes to a known member also drop its entry"""
+    if member_id is not None:
+        cache.invalidate(member_key(member_id))
+    cache.invalidate_prefix(MEMBER_TOTALS_PREFIX)
@@ -0,0 +1,53 @@
+import hashlib
+from typing import Any, Awaitable, Callable
+from fastapi import Request, Response
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+from api.utils.db import db
+
+# One counter document per collection, bumped by every write that goes through the API
+versions_collection = db.collection_versions
+
+
+async def mark_changed(collection_name: str) -> None:
+    await versions_collection.update_one({"_id": collection_name}, {"$inc": {"version": 1}}, upsert=True)
+
+
+async def compute_etag(collection_name: str, request: Request) -> str:
+    counter = await versions_collection.find_one({"_id": collection_name})
+    version = counter["version"] if counter else 0
+    # The document count is metadata only and catches inserts/deletes made outside the API
+    count = await db[collection_name].estimated_document_count()
+    # Different pages/projections of the same collection must not share a tag
+    query = hashlib.sha1(str(request.url.query).encode()).hexdigest()[:12]
+    return f'W/"{collection_name}-{version}-{count}-{query}"'
+
+
+def _matches(if_none_match: str, etag: str) -> bool:
+    if if_none_match.strip() == "*":
+        return True
+    # Weak comparison, as RFC 9110 requires for If-None-Match
+    wanted = etag[2:] if etag.startswith("W/") else etag
+    for tag in if_none_match.split(","):
+        tag = tag.strip()
+        if (tag[2:] if tag.startswith("W/") else tag) == wanted:
+            return True
+    return False
+
+
+async def conditional_json(request: Request, collection_name: str, build: Callable[[str], Awaitable[Any]]) -> Response:
+    """
+    Answer 304 when the client's copy is current, otherwise build the body and tag it.
+
+    build gets the ETag. Versions are shared by all workers while body caches
+    are per process, so a cached body must be keyed by the tag it is sent
+    with, or a worker that missed a write would tag its stale copy as current.
+    """
+    etag = await compute_etag(collection_name, request)
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match and _matches(if_none_match, etag):
+        return Response(status_code=304, headers=headers)
+
+    return JSONResponse(jsonable_encoder(await build(etag)), headers=headers)
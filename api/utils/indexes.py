@@ -0,0 +1,131 @@
+import asyncio
+import logging
+from typing import Optional
+from pymongo import ASCENDING, IndexModel
+from pymongo.errors import ConnectionFailure, PyMongoError
+from api.utils.db import db
+
+logger = logging.getLogger(__name__)
+
+# Every lookup the routes do, declared as an index so none of them is a collection scan.
+# Keys are collection names, names are fixed so the verification report is stable.
+REQUIRED_INDEXES = {
+    "members": [
+        # Approved non-members are inserted without an id, only string ids must be unique
+        IndexModel([("id", ASCENDING)], name="id_unique", unique=True,
+                   partialFilterExpression={"id": {"$type": "string"}}),
+        IndexModel([("email", ASCENDING)], name="email"),
+        IndexModel([("phone", ASCENDING), ("member_true", ASCENDING)], name="phone_member_true"),
+        # Pages are sorted on _id (api/utils/pagination.py), so indexes behind paginated filters that
+        # match many members end in _id: equality on the leading keys, then the index order is the
+        # page order and a page reads limit + 1 keys instead of sorting every match.
+        # /members/filter on both fields
+        IndexModel([("member_true", ASCENDING), ("amount_subscription", ASCENDING), ("_id", ASCENDING)],
+                   name="member_true_amount_subscription__id"),
+        # /non_members and /members/filter?member_true=
+        IndexModel([("member_true", ASCENDING), ("_id", ASCENDING)], name="member_true__id"),
+        # /members/filter?amount_subscription=
+        IndexModel([("amount_subscription", ASCENDING), ("_id", ASCENDING)], name="amount_subscription__id"),
+        # Equality and range searches in /members/search
+        IndexModel([("year_of_joining", ASCENDING), ("_id", ASCENDING)], name="year_of_joining__id"),
+    ],
+    "users": [
+        IndexModel([("email", ASCENDING)], name="email_unique", unique=True),
+    ],
+    "non_members": [
+        IndexModel([("phone", ASCENDING)], name="phone"),
+        IndexModel([("email", ASCENDING)], name="email"),
+    ],
+    # Events are only ever listed in full, _id is enough
+    "events": [],
+    "image_hashes": [
+        IndexModel([("store", ASCENDING), ("sha256", ASCENDING)], name="store_sha256_unique", unique=True),
+    ],
+    # Lookups are by _id; entries are only needed until the token they block would expire anyway
+    "revoked_tokens": [
+        IndexModel([("expires_at", ASCENDING)], name="expires_at_ttl", expireAfterSeconds=0),
+    ],
+}
+
+
+# Indexes an earlier spec created and a current one replaces, dropped by ensure_indexes
+RETIRED_INDEXES = {
+    "members": ["member_true_amount_subscription", "year_of_joining"],
+}
+
+
+async def ensure_indexes() -> bool:
+    """Create the declared indexes; existing ones with the same spec are a no-op. False if Mongo was unreachable."""
+    for collection_name, indexes in REQUIRED_INDEXES.items():
+        if not indexes:
+            continue
+        try:
+            await db[collection_name].create_indexes(indexes)
+        except ConnectionFailure as e:
+            # Every other collection would wait out the same server selection timeout
+            logger.error("Could not reach Mongo to create indexes: %s", e)
+            return False
+        except PyMongoError as e:
+            # Usually duplicates already in the data, don't keep the API from starting
+            logger.error("Could not create indexes on %s: %s", collection_name, e)
+            continue
+
+        # Only once the replacements exist, so the queries never lose their index
+        retired = RETIRED_INDEXES.get(collection_name)
+        if retired:
+            try:
+                existing = await db[collection_name].index_information()
+                for name in retired:
+                    if name in existing:
+                        await db[collection_name].drop_index(name)
+            except PyMongoError as e:
+                logger.error("Could not drop retired indexes on %s: %s", collection_name, e)
+    return True
+
+
+_indexes_synced = False
+# Created on first use, on Python 3.9 a lock binds to the loop current at construction
+_sync_lock: Optional[asyncio.Lock] = None
+
+
+async def ensure_indexes_once() -> None:
+    """
+    ensure_indexes() the first time this process needs the database.
+
+    Lazy mode skips the sync on startup, but writes rely on the unique and TTL
+    indexes (hash claims, member ids, refresh token expiry), so it is deferred
+    to the first request instead of dropped. If Mongo was unreachable the
+    next request tries again; other failures (duplicates in the data) are
+    logged once, /admin/indexes/sync reruns it.
+    """
+    global _indexes_synced, _sync_lock
+    if _indexes_synced:
+        return
+    if _sync_lock is None:
+        _sync_lock = asyncio.Lock()
+    async with _sync_lock:
+        if not _indexes_synced:
+            _indexes_synced = await ensure_indexes()
+
+
+async def index_report() -> dict:
+    """Compare declared indexes with the live ones and flag indexes that were never used"""
+    report = {}
+    for collection_name, indexes in REQUIRED_INDEXES.items():
+        collection = db[collection_name]
+        declared = {index.document["name"] for index in indexes}
+        existing = set((await collection.index_information()).keys()) - {"_id_"}
+
+        usage = {}
+        cursor = await collection.aggregate([{"$indexStats": {}}])
+        async for stat in cursor:
+            usage[stat["name"]] = stat["accesses"]["ops"]
+
+        report[collection_name] = {
+            "missing": sorted(declared - existing),
+            "unexpected": sorted(existing - declared),
+            # Counters reset on mongod restart, so treat this as a hint, not proof
+            "unused": sorted(name for name in existing if usage.get(name, 0) == 0),
+            "usage": {name: usage.get(name, 0) for name in sorted(existing)},
+        }
+    return report
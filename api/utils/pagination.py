@@ -0,0 +1,56 @@
+import re
+from typing import Optional, Tuple
+from bson import ObjectId
+from fastapi import HTTPException
+
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 1000
+
+FIELD_NAME = re.compile(r"^[A-Za-z_][A-Za-z0-9_.]*$")
+
+
+def parse_fields(fields: Optional[str]) -> Optional[dict]:
+    """Turn a comma separated `fields=` query value into a Mongo projection"""
+    if not fields:
+        return None
+
+    names = [name.strip() for name in fields.split(",") if name.strip()]
+    invalid = [name for name in names if not FIELD_NAME.match(name)]
+    if invalid:
+        raise HTTPException(status_code=400, detail=f"Invalid field name(s): {', '.join(invalid)}")
+
+    # _id is always returned, it doubles as the page cursor
+    return {name: 1 for name in names}
+
+
+def parse_cursor(after: Optional[str]) -> Optional[ObjectId]:
+    if not after:
+        return None
+    if not ObjectId.is_valid(after):
+        raise HTTPException(status_code=400, detail="Invalid cursor.")
+    return ObjectId(after)
+
+
+def page_cursor(collection, query: dict, limit: int, after: Optional[str] = None, fields: Optional[str] = None):
+    """The query fetch_page runs, also what explain() should be asked about"""
+    cursor_id = parse_cursor(after)
+    if cursor_id is not None:
+        query = {**query, "_id": {"$gt": cursor_id}}
+
+    # Ask for one extra row to know whether another page exists
+    return collection.find(query, parse_fields(fields)).sort("_id", 1).limit(limit + 1)
+
+
+async def fetch_page(collection, query: dict, limit: int, after: Optional[str] = None, fields: Optional[str] = None) -> Tuple[list, Optional[str]]:
+    """Keyset pagination on _id: each page is an index range scan, however deep it is"""
+    docs = await page_cursor(collection, query, limit, after, fields).to_list(limit + 1)
+
+    next_cursor = None
+    if len(docs) > limit:
+        docs = docs[:limit]
+        next_cursor = str(docs[-1]["_id"])
+
+    for doc in docs:
+        doc["_id"] = str(doc["_id"])
+
+    return docs, next_cursor
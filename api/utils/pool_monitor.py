@@ -0,0 +1,80 @@
+from collections import deque
+from pymongo import monitoring
+
+
+class PoolMonitor(monitoring.ConnectionPoolListener):
+    """Collects connection checkout wait times so the pool can be sized to the Atlas tier"""
+
+    def __init__(self, sample_size: int = 2048):
+        self.checkouts = 0
+        self.failed_checkouts = 0
+        self.failure_reasons = {}
+        self.open_connections = 0
+        self.checked_out = 0
+        self.max_wait_ms = 0.0
+        self.total_wait_ms = 0.0
+        self._samples = deque(maxlen=sample_size)
+
+    def connection_check_out_started(self, event):
+        pass
+
+    def connection_checked_out(self, event):
+        # Seconds from checkout start until a connection was handed over
+        wait_ms = event.duration * 1000
+        self.checkouts += 1
+        self.checked_out += 1
+        self.total_wait_ms += wait_ms
+        self.max_wait_ms = max(self.max_wait_ms, wait_ms)
+        self._samples.append(wait_ms)
+
+    def connection_check_out_failed(self, event):
+        self.failed_checkouts += 1
+        reason = str(event.reason)
+        self.failure_reasons[reason] = self.failure_reasons.get(reason, 0) + 1
+
+    def connection_checked_in(self, event):
+        self.checked_out = max(0, self.checked_out - 1)
+
+    def connection_created(self, event):
+        self.open_connections += 1
+
+    def connection_closed(self, event):
+        self.open_connections = max(0, self.open_connections - 1)
+
+    def connection_ready(self, event):
+        pass
+
+    def pool_created(self, event):
+        pass
+
+    def pool_ready(self, event):
+        pass
+
+    def pool_cleared(self, event):
+        pass
+
+    def pool_closed(self, event):
+        pass
+
+    def stats(self) -> dict:
+        samples = sorted(self._samples)
+
+        def percentile(p: float) -> float:
+            return round(samples[min(len(samples) - 1, int(len(samples) * p))], 3) if samples else 0.0
+
+        return {
+            "checkouts": self.checkouts,
+            "failed_checkouts": self.failed_checkouts,
+            "failure_reasons": self.failure_reasons,
+            "open_connections": self.open_connections,
+            "checked_out": self.checked_out,
+            "wait_ms": {
+                "avg": round(self.total_wait_ms / self.checkouts, 3) if self.checkouts else 0.0,
+                "p50": percentile(0.5),
+                "p99": percentile(0.99),
+                "max": round(self.max_wait_ms, 3),
+            },
+        }
+
+
+pool_monitor = PoolMonitor()
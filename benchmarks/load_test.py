@@ -0,0 +1,133 @@
+"""
+Throughput vs. worker count for the production launcher.
+
+    python benchmarks/load_test.py --path / --workers 1 2 4 --duration 10
+
+For every worker count it starts `python -m api.serve` on a free port, waits
+for it to answer, drives it with keep-alive HTTP/1.1 connections for the given
+duration and prints requests per second. Extra headers (e.g. an Authorization
+bearer for protected endpoints) can be passed with --header.
+
+The client is plain asyncio so it needs nothing beyond the standard library;
+run it on a different machine than the server for numbers that are not capped
+by the load generator itself.
+"""
+import argparse
+import asyncio
+import os
+import socket
+import subprocess
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+async def read_response(reader: asyncio.StreamReader) -> int:
+    status_line = await reader.readline()
+    if not status_line:
+        raise ConnectionError("Connection closed")
+    status = int(status_line.split()[1])
+    length = 0
+    chunked = False
+    while True:
+        line = await reader.readline()
+        if line in (b"\r\n", b""):
+            break
+        name, _, value = line.decode("latin-1").partition(":")
+        if name.lower() == "content-length":
+            length = int(value.strip())
+        elif name.lower() == "transfer-encoding" and "chunked" in value.lower():
+            chunked = True
+    if chunked:
+        while True:
+            size = int((await reader.readline()).strip(), 16)
+            await reader.readexactly(size + 2)
+            if size == 0:
+                break
+    else:
+        await reader.readexactly(length)
+    return status
+
+
+async def connection_loop(port: int, request: bytes, deadline: float, stats: dict):
+    reader, writer = await asyncio.open_connection("127.0.0.1", port)
+    try:
+        while time.perf_counter() < deadline:
+            started = time.perf_counter()
+            writer.write(request)
+            await writer.drain()
+            status = await read_response(reader)
+            stats["latencies"].append(time.perf_counter() - started)
+            stats["ok" if status < 400 else "errors"] += 1
+    finally:
+        writer.close()
+
+
+async def drive(port: int, path: str, headers: list, connections: int, duration: float) -> dict:
+    lines = [f"GET {path} HTTP/1.1", f"Host: 127.0.0.1:{port}", "Connection: keep-alive", *headers]
+    request = ("\r\n".join(lines) + "\r\n\r\n").encode()
+    stats = {"ok": 0, "errors": 0, "latencies": []}
+    deadline = time.perf_counter() + duration
+    await asyncio.gather(*(connection_loop(port, request, deadline, stats) for _ in range(connections)))
+    return stats
+
+
+def wait_until_ready(port: int, process: subprocess.Popen, timeout: float = 30):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError("Server exited during startup")
+        try:
+            with socket.create_connection(("127.0.0.1", port), timeout=0.5):
+                return
+        except OSError:
+            time.sleep(0.2)
+    raise TimeoutError(f"Server did not start within {timeout}s")
+
+
+def run(workers: int, args) -> dict:
+    port = free_port()
+    env = {**os.environ, "WEB_CONCURRENCY": str(workers), "PORT": str(port), "HOST": "127.0.0.1", "LOG_LEVEL": "warning"}
+    process = subprocess.Popen([sys.executable, "-m", "api.serve"], cwd=ROOT, env=env)
+    try:
+        wait_until_ready(port, process)
+        # Warm every worker before measuring
+        asyncio.run(drive(port, args.path, args.header, args.connections, 1))
+        return asyncio.run(drive(port, args.path, args.header, args.connections, args.duration))
+    finally:
+        process.terminate()
+        process.wait(timeout=30)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--path", default="/")
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4])
+    parser.add_argument("--connections", type=int, default=64)
+    parser.add_argument("--duration", type=float, default=10)
+    parser.add_argument("--header", action="append", default=[], help="Extra request header, 'Name: value'")
+    args = parser.parse_args()
+
+    print(f"{'workers':>8} {'req/s':>10} {'p50 ms':>8} {'p99 ms':>8} {'errors':>7}")
+    baseline = None
+    for workers in args.workers:
+        stats = run(workers, args)
+        latencies = sorted(stats["latencies"]) or [0]
+        rps = (stats["ok"] + stats["errors"]) / args.duration
+        baseline = baseline or rps
+        print(
+            f"{workers:>8} {rps:>10.0f} {latencies[len(latencies) // 2] * 1000:>8.1f} "
+            f"{latencies[int(len(latencies) * 0.99)] * 1000:>8.1f} {stats['errors']:>7}"
+            f"   x{rps / baseline:.2f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,85 @@
+"""
+Password verification throughput and event-loop stalls during a login burst.
+
+    python benchmarks/login_throughput.py --workers 1 2 4 --logins 64 --rounds 12
+
+For every worker count it fires --logins concurrent verifications through a
+PasswordHasher with that many threads while a ticker coroutine measures how
+late the event loop wakes it up, and prints logins per second, logins per
+second per worker and the worst loop lag. The "inline" row runs the same
+burst the way login used to, with bcrypt on the event loop thread.
+
+Needs no database; only the bcrypt backend of passlib.
+"""
+import argparse
+import asyncio
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+TICK = 0.005
+PASSWORD = "correct horse battery staple"
+
+
+async def measure_lag(stop: asyncio.Event) -> float:
+    worst = 0.0
+    while not stop.is_set():
+        started = time.perf_counter()
+        await asyncio.sleep(TICK)
+        worst = max(worst, time.perf_counter() - started - TICK)
+    return worst
+
+
+async def burst(verify, hashed: str, logins: int) -> tuple:
+    stop = asyncio.Event()
+    ticker = asyncio.create_task(measure_lag(stop))
+    await asyncio.sleep(0)
+    started = time.perf_counter()
+    results = await asyncio.gather(*(verify(PASSWORD, hashed) for _ in range(logins)))
+    elapsed = time.perf_counter() - started
+    stop.set()
+    lag = await ticker
+    assert all(results)
+    return elapsed, lag
+
+
+async def inline_verify(password: str, hashed: str) -> bool:
+    from api.utils.db import get_pwd_context
+    return get_pwd_context().verify(password, hashed)
+
+
+def report(label: str, logins: int, workers: int, elapsed: float, lag: float):
+    rate = logins / elapsed
+    print(f"{label:>8} {rate:>10.1f} {rate / workers:>12.1f} {lag * 1000:>12.1f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, os.cpu_count() or 1])
+    parser.add_argument("--logins", type=int, default=64)
+    parser.add_argument("--rounds", type=int, default=12)
+    args = parser.parse_args()
+
+    os.environ["BCRYPT_ROUNDS"] = str(args.rounds)
+    from api.services.password_hasher import PasswordHasher
+    from api.utils.db import get_pwd_context
+
+    hashed = get_pwd_context().hash(PASSWORD)
+    print(f"{'workers':>8} {'logins/s':>10} {'per worker':>12} {'max lag ms':>12}")
+
+    elapsed, lag = asyncio.run(burst(inline_verify, hashed, args.logins))
+    report("inline", args.logins, 1, elapsed, lag)
+
+    for workers in sorted(set(args.workers)):
+        hasher = PasswordHasher(workers, max_pending=args.logins)
+        try:
+            elapsed, lag = asyncio.run(burst(hasher.verify, hashed, args.logins))
+        finally:
+            hasher.shutdown()
+        report(str(workers), args.logins, workers, elapsed, lag)
+
+
+if __name__ == "__main__":
+    main()
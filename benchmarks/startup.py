@@ -0,0 +1,105 @@
+"""
+Cold-start cost of the API.
+
+    python benchmarks/startup.py --runs 5 --top 15
+
+Measures, each in a fresh interpreter:
+
+  * import   - wall time of `import api.main`
+  * first    - time from launching uvicorn until the first response to --path
+
+and prints the median and worst of each, followed by the modules with the
+largest cumulative import time (from `python -X importtime`) so a regression
+can be traced to whatever started importing it. LAZY_INIT=1 is set unless the
+environment already sets it, which is how the app runs on Vercel.
+"""
+import argparse
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import time
+import urllib.request
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+IMPORT_SNIPPET = "import time; t = time.perf_counter(); import api.main; print(time.perf_counter() - t)"
+
+
+def child_env() -> dict:
+    return {"LAZY_INIT": "1", **os.environ, "PYTHONDONTWRITEBYTECODE": "1"}
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def time_import() -> float:
+    output = subprocess.run(
+        [sys.executable, "-c", IMPORT_SNIPPET], cwd=ROOT, env=child_env(),
+        capture_output=True, text=True, check=True
+    )
+    return float(output.stdout.strip().splitlines()[-1])
+
+
+def time_first_response(path: str, timeout: float = 30) -> float:
+    port = free_port()
+    started = time.perf_counter()
+    process = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "api.main:app", "--port", str(port), "--log-level", "warning"],
+        cwd=ROOT, env=child_env()
+    )
+    try:
+        while time.perf_counter() - started < timeout:
+            if process.poll() is not None:
+                raise RuntimeError("Server exited during startup")
+            try:
+                with urllib.request.urlopen(f"http://127.0.0.1:{port}{path}", timeout=1) as response:
+                    response.read()
+                return time.perf_counter() - started
+            except OSError:
+                time.sleep(0.01)
+        raise TimeoutError(f"No response within {timeout}s")
+    finally:
+        process.terminate()
+        process.wait(timeout=30)
+
+
+def slowest_imports(top: int) -> list:
+    output = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import api.main"], cwd=ROOT, env=child_env(),
+        capture_output=True, text=True, check=True
+    )
+    rows = []
+    for line in output.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative_us, name = line.split("|")
+        rows.append((int(cumulative_us), name.strip()))
+    return sorted(rows, reverse=True)[:top]
+
+
+def report(label: str, samples: list):
+    print(f"{label:>8}  median {statistics.median(samples) * 1000:8.1f} ms   worst {max(samples) * 1000:8.1f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--path", default="/")
+    parser.add_argument("--top", type=int, default=15, help="How many of the slowest imports to list")
+    args = parser.parse_args()
+
+    report("import", [time_import() for _ in range(args.runs)])
+    report("first", [time_first_response(args.path) for _ in range(args.runs)])
+
+    if args.top:
+        print(f"\n{'cumulative ms':>14}  module")
+        for cumulative_us, name in slowest_imports(args.top):
+            print(f"{cumulative_us / 1000:>14.1f}  {name}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,74 @@
+"""
+Copy the images stored on local disk into the bucket.
+
+Run once when switching STORAGE_BACKEND from local to s3, with the same
+environment as the API, from the directory the API ran in:
+
+    STORAGE_BACKEND=s3 S3_BUCKET=... python migrate_images.py
+
+Photo and event documents keep their file names, so once the files are in
+the bucket the existing /images/<file> and event image urls resolve again.
+Files already in the bucket are skipped, so the script can be re-run.
+"""
+import argparse
+import asyncio
+import mimetypes
+import shutil
+from uuid import uuid4
+from api.services.image_store import LOCAL_STORES, STAGING_DIR, STORES
+
+
+async def migrate_store(name: str, dry_run: bool = False) -> dict:
+    directory, _ = LOCAL_STORES[name]
+    storage = STORES[name]
+    counts = {"copied": 0, "skipped": 0, "failed": 0}
+    if not directory.is_dir():
+        return counts
+
+    for path in sorted(directory.iterdir()):
+        if not path.is_file():
+            continue
+        if await storage.exists(path.name):
+            counts["skipped"] += 1
+            continue
+        if dry_run:
+            print(f"Would copy {path} -> {name}/{path.name}")
+            counts["copied"] += 1
+            continue
+
+        # put_file consumes its input, so upload a staged copy and keep the original
+        staged = STAGING_DIR / f"{uuid4().hex}{path.suffix}"
+        try:
+            shutil.copyfile(path, staged)
+            content_type = mimetypes.guess_type(path.name)[0] or "application/octet-stream"
+            await storage.put_file(staged, path.name, content_type=content_type)
+            counts["copied"] += 1
+        except Exception as e:
+            print(f"Failed to copy {path}: {e}")
+            counts["failed"] += 1
+        finally:
+            if staged.exists():
+                staged.unlink()
+    return counts
+
+
+async def main(dry_run: bool = False) -> int:
+    if all(storage.local for storage in STORES.values()):
+        print("STORAGE_BACKEND is local, nothing to migrate")
+        return 1
+
+    STAGING_DIR.mkdir(parents=True, exist_ok=True)
+    failed = 0
+    for name in LOCAL_STORES:
+        counts = await migrate_store(name, dry_run)
+        failed += counts["failed"]
+        copied = "to copy" if dry_run else "copied"
+        print(f"{name}: {counts['copied']} {copied}, {counts['skipped']} already in the bucket, {counts['failed']} failed")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Copy locally stored images into the configured bucket")
+    parser.add_argument("--dry-run", action="store_true", help="List the files that would be copied")
+    args = parser.parse_args()
+    raise SystemExit(asyncio.run(main(args.dry_run)))
@@ -0,0 +1,177 @@
+"""
+Column-wise cleaning of the Excel member roster.
+
+Does the same job as create_member_data / validate_member_data in script.py,
+but on a whole DataFrame at once with pandas string and datetime operations
+instead of per-row Python calls.
+"""
+from datetime import datetime
+from typing import List, Tuple
+
+import pandas as pd
+
+EMPTY_MARKERS = ['', 'nan', 'NaN', 'NULL', 'null', 'None']
+PLACEHOLDER_EMAIL = "placeholder@example.com"
+EMAIL_PATTERN = r'[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Za-z]{2,}'
+# Longest group first and not glued to another letter, so "AB+" is not read as "B+"
+BLOOD_GROUP_PATTERN = r'(?<![A-Z])(AB|A|B|O)\s?([+-])'
+
+# Same formats, in the same order, as parse_date in script.py
+DATE_FORMATS = [
+    "%Y-%m-%d",
+    "%d/%m/%Y",
+    "%m/%d/%Y",
+    "%d-%m-%Y",
+    "%Y/%m/%d",
+    "%d.%m.%Y",
+    "%Y",
+    "%Y-%m-%d %H:%M:%S"
+]
+
+# Candidate source columns per field, first non-empty one wins
+ID_COLUMNS = ["Member  ship No."]
+NAME_COLUMNS = ["Name of the Member", "Name", "Member Name", "Full Name"]
+ADDRESS_COLUMNS = ["Address", "Full Address", "Residential Address"]
+PHONE_COLUMNS = ["Mobile", "Phone", "Contact", "Mobile No.", "Phone No."]
+JOINING_DATE_COLUMNS = ["Date of Joining", "Joining Date", "Join Date", "DOJ"]
+AREA_COLUMNS = ["Area", "Location", "District"]
+CITY_COLUMNS = ["City", "Town"]
+RES_NO_COLUMNS = ["Res.No.", "Residence No.", "Res No", "Home No."]
+REMARKS_COLUMNS = ["Remarks", "Notes", "Comments"]
+EMAIL_BLOOD_COLUMNS = ["Email Blood Group", "Email & Blood Group", "Email/Blood Group", "Email", "Blood Group"]
+EMAIL_COLUMNS = ["Email", "Email ID", "E-mail"]
+BLOOD_GROUP_COLUMNS = ["Blood Group", "Blood Type", "BG"]
+
+REQUIRED_FIELDS = ["id", "name", "address", "email", "phone"]
+REJECTION_COLUMN = "rejection_reason"
+
+
+def as_text(col: pd.Series) -> pd.Series:
+    """Stripped strings with empty markers as NaN; whole numbers from Excel lose their '.0'"""
+    if pd.api.types.is_numeric_dtype(col) and not pd.api.types.is_bool_dtype(col):
+        numbers = col
+        is_number = col.notna()
+    else:
+        is_number = col.map(lambda v: isinstance(v, (int, float)) and not isinstance(v, bool))
+        numbers = pd.to_numeric(col.where(is_number), errors="coerce")
+
+    text = col.astype(str).str.strip()
+    whole = is_number & numbers.notna() & (numbers % 1 == 0)
+    text = text.mask(whole, numbers[whole].astype("int64").astype(str))
+    return text.mask(col.isna() | text.isin(EMPTY_MARKERS))
+
+
+def coalesce(df: pd.DataFrame, names: List[str]) -> pd.Series:
+    """First non-empty value across the candidate columns, like get_column_value"""
+    result = pd.Series(pd.NA, index=df.index, dtype=object)
+    for name in names:
+        if name in df.columns:
+            result = result.where(result.notna(), as_text(df[name]))
+    return result
+
+
+def coalesce_raw(df: pd.DataFrame, names: List[str]) -> pd.Series:
+    """Like coalesce, but keeps the original cell values (datetimes stay datetimes)"""
+    result = pd.Series(pd.NA, index=df.index, dtype=object)
+    found = pd.Series(False, index=df.index)
+    for name in names:
+        if name in df.columns:
+            take = ~found & as_text(df[name]).notna()
+            result = result.mask(take, df[name])
+            found |= take
+    return result
+
+
+def parse_years(col: pd.Series) -> pd.Series:
+    """Year of joining: one to_datetime pass per format over the still unparsed values"""
+    if pd.api.types.is_datetime64_any_dtype(col):
+        return col.dt.year.astype("Int64")
+
+    years = pd.Series(pd.NA, index=col.index, dtype="Int64")
+
+    # Excel cells already read as datetimes
+    is_date = col.map(lambda v: isinstance(v, datetime))
+    if is_date.any():
+        years[is_date] = pd.to_datetime(col[is_date]).dt.year.astype("Int64")
+
+    text = as_text(col.where(~is_date))
+    for fmt in DATE_FORMATS:
+        pending = text.notna() & years.isna()
+        if not pending.any():
+            break
+        parsed = pd.to_datetime(text[pending], format=fmt, errors="coerce")
+        years[pending] = parsed.dt.year.astype("Int64")
+
+    return years
+
+
+def clean_roster(df: pd.DataFrame) -> Tuple[pd.DataFrame, pd.Series]:
+    """
+    Clean a roster DataFrame column by column.
+
+    Returns the cleaned frame (one row per input row, member fields plus a
+    rejection_reason column) and a boolean mask of the rows that failed the
+    same checks as validate_member_data.
+    """
+    df = df.rename(columns=lambda c: str(c).strip())
+
+    combined = coalesce(df, EMAIL_BLOOD_COLUMNS)
+    email = combined.str.extract(f'({EMAIL_PATTERN})', expand=False)
+    # Look for the blood group in what is left once the email is removed
+    rest = combined.str.replace(EMAIL_PATTERN, '', regex=True).str.upper()
+    blood = rest.str.extract(BLOOD_GROUP_PATTERN)
+    blood_group = blood[0] + blood[1]
+
+    # Separate columns only when there was no combined field at all
+    no_combined = combined.isna()
+    email = email.mask(no_combined, coalesce(df, EMAIL_COLUMNS))
+    blood_group = blood_group.mask(no_combined, coalesce(df, BLOOD_GROUP_COLUMNS))
+
+    # Digits only, numeric cells were already turned into whole-number strings
+    phone = coalesce(df, PHONE_COLUMNS).str.replace(r'\D', '', regex=True)
+
+    cleaned = pd.DataFrame({
+        "id": coalesce(df, ID_COLUMNS).fillna(""),
+        "name": coalesce(df, NAME_COLUMNS).fillna(""),
+        "address": coalesce(df, ADDRESS_COLUMNS).fillna(""),
+        "email": email.fillna(PLACEHOLDER_EMAIL),
+        "phone": phone.fillna(""),
+        "year_of_joining": parse_years(coalesce_raw(df, JOINING_DATE_COLUMNS)),
+        "area": coalesce(df, AREA_COLUMNS),
+        "city": coalesce(df, CITY_COLUMNS),
+        "res_no": coalesce(df, RES_NO_COLUMNS),
+        "blood_grp": blood_group,
+        "remarks": coalesce(df, REMARKS_COLUMNS),
+    }, index=df.index)
+
+    # Same order of checks as validate_member_data, the first failing one is reported
+    bad_email = (cleaned["email"] != PLACEHOLDER_EMAIL) & ~cleaned["email"].str.fullmatch(EMAIL_PATTERN)
+    reason = pd.Series(None, index=df.index, dtype=object)
+    reason = reason.mask(bad_email, "Invalid email format: " + cleaned["email"])
+    reason = reason.mask(cleaned["name"] == "", "Missing required field: name")
+    reason = reason.mask(cleaned["id"] == "", "Empty ID field")
+    cleaned[REJECTION_COLUMN] = reason
+
+    return cleaned, reason.notna()
+
+
+def member_records(cleaned: pd.DataFrame) -> List[dict]:
+    """API payloads for cleaned rows: required fields always, optional ones only when set"""
+    records = []
+    for row in cleaned.drop(columns=[REJECTION_COLUMN]).to_dict("records"):
+        member_data = {}
+        for key, value in row.items():
+            if key in REQUIRED_FIELDS:
+                member_data[key] = value
+            elif value is not None and not pd.isna(value):
+                member_data[key] = int(value) if key == "year_of_joining" else value
+        member_data.update({
+            # Default values for required fields
+            "amount_paid_total": 0.0,
+            "member_true": True,
+            "amount_paid_registration": 0.0,
+            "amount_paid_subscription": 0.0,
+            "amount_subscription": False
+        })
+        records.append(member_data)
+    return records
@@ -3,13 +3,41 @@ import requests
 import json
 import re
 import os
+import argparse
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from contextlib import closing
 from datetime import datetime
 from typing import Optional, Tuple
+from openpyxl import load_workbook
+from requests.adapters import HTTPAdapter
+from roster_cleaning import REJECTION_COLUMN, clean_roster, member_records
 
 # Configuration
 API_BASE_URL = "http://0.0.0.0:8002"
 CSV_FILE_PATH = "IKS Members List.xlsx"
 ERROR_LOG_FILE = "failed_uploads_log.xlsx"
+# /members/bulk needs an admin token (the access_token returned by /login)
+API_TOKEN = os.environ.get("API_TOKEN")
+BULK_BATCH_SIZE = 500
+# Parallel import: batches in flight at once, and where progress is recorded for --resume
+IMPORT_CONCURRENCY = 4
+CHECKPOINT_FILE = "import_checkpoint.json"
+# Rows read and shown by the single-record test run
+PREVIEW_ROWS = 5
+
+_session = None
+
+def get_session(pool_size: int = IMPORT_CONCURRENCY) -> requests.Session:
+    """One pooled session so batches reuse keep-alive connections instead of reconnecting"""
+    global _session
+    if _session is None:
+        _session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+        _session.mount("http://", adapter)
+        _session.mount("https://", adapter)
+    return _session
 
 def is_empty_value(value) -> bool:
     """Check if a value is empty, None, NaN, or just whitespace"""
@@ -278,6 +306,100 @@ def upload_member(member_data: dict) -> Tuple[bool, str]:
     except Exception as e:
         return False, f"Unexpected error: {str(e)}"
 
+def upload_members_bulk(members: list) -> Tuple[bool, object]:
+    """Upload a batch of members in one request, the API answers with one result per row"""
+    headers = {"Content-Type": "application/json"}
+    if API_TOKEN:
+        headers["Authorization"] = f"Bearer {API_TOKEN}"
+
+    try:
+        response = get_session().post(
+            f"{API_BASE_URL}/members/bulk",
+            json=members,
+            headers=headers,
+            timeout=120
+        )
+        
+        if response.status_code == 200:
+            return True, response.json()
+        else:
+            error_msg = f"HTTP {response.status_code}: {response.text}"
+            return False, error_msg
+            
+    except requests.exceptions.RequestException as e:
+        return False, f"Request error: {str(e)}"
+    except Exception as e:
+        return False, f"Unexpected error: {str(e)}"
+
+def build_failed_record(row, error_type: str, error_message: str, member_id, record_num: int, processed_data) -> dict:
+    """Original row plus the error columns save_failed_records_to_excel expects"""
+    failed_record = dict(row)
+    failed_record['Error_Type'] = error_type
+    failed_record['Error_Message'] = error_message
+    failed_record['Member_ID'] = member_id
+    failed_record['Row_Number'] = record_num
+    failed_record['Processed_Data'] = processed_data
+    return failed_record
+
+def upload_batch(batch: list, failed_records: list) -> Tuple[bool, int]:
+    """Send (record_num, row, member_data) tuples to /members/bulk; returns (acknowledged, inserted)"""
+    if not batch:
+        return True, 0
+
+    success, result = upload_members_bulk([member_data for _, _, member_data in batch])
+
+    if not success:
+        print(f"   ❌ Batch Upload Error: {str(result)[:100]}...")
+        for record_num, row, member_data in batch:
+            failed_records.append(build_failed_record(
+                row, 'Upload Error', str(result), member_data.get('id'), record_num,
+                json.dumps(member_data, default=str)
+            ))
+        return False, 0
+
+    # Results come back in request order
+    for row_result, (record_num, row, member_data) in zip(result['results'], batch):
+        if row_result['status'] != 'inserted':
+            failed_records.append(build_failed_record(
+                row, row_result['Error_Type'], row_result['Error_Message'],
+                row_result.get('Member_ID') or member_data.get('id'), record_num,
+                json.dumps(member_data, default=str)
+            ))
+
+    print(f"   📦 Batch of {len(batch)}: {result['inserted']} inserted, {result['failed']} failed")
+    return True, result['inserted']
+
+def prepare_batch(chunk: pd.DataFrame, first_record_num: int, total: int) -> Tuple[list, list]:
+    """Clean a chunk of rows column-wise; returns the batch for /members/bulk and the rows rejected locally"""
+    rows = chunk.to_dict("records")
+
+    try:
+        cleaned, rejected = clean_roster(chunk)
+        records = member_records(cleaned)
+    except Exception as e:
+        print(f"[{first_record_num}-{first_record_num + len(rows) - 1}/{total}] ❌ Processing Exception: {str(e)}")
+        return [], [
+            build_failed_record(row, 'Processing Exception', str(e), 'Could not extract', first_record_num + i, 'Could not process')
+            for i, row in enumerate(rows)
+        ]
+
+    batch = []
+    failed_records = []
+    for position, (row, member_data) in enumerate(zip(rows, records)):
+        record_num = first_record_num + position
+        if rejected.iloc[position]:
+            validation_msg = cleaned[REJECTION_COLUMN].iloc[position]
+            member_id = member_data.get('id', 'NO_ID')
+            print(f"[{record_num}/{total}] ❌ Validation Error ({member_id}): {validation_msg}")
+            failed_records.append(build_failed_record(
+                row, 'Validation Error', validation_msg, member_id, record_num,
+                json.dumps(member_data, default=str)
+            ))
+        else:
+            batch.append((record_num, row, member_data))
+
+    return batch, failed_records
+
 def validate_member_data(member_data: dict) -> Tuple[bool, str]:
     """Validate member data before sending to API"""
     # Check required fields
@@ -328,6 +450,61 @@ def read_excel_file(file_path: str):
                 print(f"  default: {e3}")
                 raise e3
 
+def roster_row_count(file_path: str) -> Optional[int]:
+    """Data rows according to the sheet's dimension metadata, without reading the rows"""
+    if not file_path.lower().endswith((".xlsx", ".xlsm")):
+        return None
+    workbook = load_workbook(file_path, read_only=True)
+    try:
+        max_row = workbook.active.max_row
+        return max_row - 1 if max_row else None
+    finally:
+        workbook.close()
+
+def iter_roster_chunks(file_path: str, chunk_size: int = BULK_BATCH_SIZE):
+    """Yield the roster as DataFrames of at most chunk_size rows, memory stays bounded by the chunk"""
+    if file_path.lower().endswith(".csv"):
+        start = 0
+        for chunk in pd.read_csv(file_path, chunksize=chunk_size):
+            chunk.columns = chunk.columns.str.strip()
+            chunk.index = range(start, start + len(chunk))
+            start += len(chunk)
+            yield chunk
+        return
+
+    if not file_path.lower().endswith((".xlsx", ".xlsm")):
+        # Legacy .xls has no streaming reader, load it once and slice
+        df = read_excel_file(file_path)
+        df.columns = df.columns.str.strip()
+        for start in range(0, len(df), chunk_size):
+            yield df.iloc[start:start + chunk_size]
+        return
+
+    # read_only mode parses the sheet XML lazily instead of building the whole workbook
+    workbook = load_workbook(file_path, read_only=True, data_only=True)
+    try:
+        rows = workbook.active.iter_rows(values_only=True)
+        header = next(rows, None)
+        if header is None:
+            return
+        columns = [str(name).strip() if name is not None else f"Unnamed: {i}" for i, name in enumerate(header)]
+        width = len(columns)
+
+        buffer = []
+        start = 0
+        for values in rows:
+            if all(value is None for value in values):
+                continue
+            buffer.append(tuple(values[:width]) + (None,) * (width - len(values)))
+            if len(buffer) >= chunk_size:
+                yield pd.DataFrame(buffer, columns=columns, index=range(start, start + len(buffer)))
+                start += len(buffer)
+                buffer = []
+        if buffer:
+            yield pd.DataFrame(buffer, columns=columns, index=range(start, start + len(buffer)))
+    finally:
+        workbook.close()
+
 def save_failed_records_to_excel(failed_records):
     """Save failed records to Excel file with error details"""
     if not failed_records:
@@ -427,29 +604,28 @@ def main():
     try:
         print("Starting Excel upload process...")
         
-        # Read the Excel file
+        # Only the first few rows are read for the preview, the full import streams the rest
         try:
-            df = read_excel_file(CSV_FILE_PATH)
+            expected = roster_row_count(CSV_FILE_PATH)
+            with closing(iter_roster_chunks(CSV_FILE_PATH, PREVIEW_ROWS)) as chunks:
+                df = next(chunks, None)
         except Exception as e:
             print(f"Error reading file: {e}")
             print("\nMake sure you have the required packages installed:")
-            print("pip install openpyxl xlrd")
+            print("pip install -r requirements-scripts.txt")
             return
         
-        print(f"Successfully loaded file with {len(df)} records")
-        print("Columns found:", df.columns.tolist())
-        
-        # Clean column names - remove extra spaces
-        df.columns = df.columns.str.strip()
-        print("Cleaned columns:", df.columns.tolist())
-        
-        print("\nFirst few rows preview:")
-        print(df.head())
-        
         # Process only the first record for testing
-        if len(df) == 0:
+        if df is None or len(df) == 0:
             print("No data found in file")
             return
+        
+        print(f"Successfully opened file with {expected if expected is not None else 'an unknown number of'} records")
+        # Column names come back stripped of extra spaces
+        print("Columns found:", df.columns.tolist())
+        
+        print("\nFirst few rows preview:")
+        print(df)
             
         print(f"\n{'='*50}")
         print("PROCESSING FIRST RECORD FOR TESTING")
@@ -498,83 +674,26 @@ def main():
 def upload_all_records():
     """Function to upload ALL records with error logging"""
     try:
-        # Read the file
-        df = read_excel_file(CSV_FILE_PATH)
-        
-        # Clean column names
-        df.columns = df.columns.str.strip()
+        expected = roster_row_count(CSV_FILE_PATH)
         
         print(f"\n🚀 PROCESSING ALL RECORDS")
-        print(f"Total records in file: {len(df)}")
+        print(f"Total records in file: {expected if expected is not None else 'unknown'}")
         print(f"Working directory: {os.getcwd()}")
         print(f"{'='*60}")
         
         success_count = 0
-        error_count = 0
         failed_records = []
         
-        for index, row in df.iterrows():
-            record_num = index + 1
-            print(f"\n[{record_num}/{len(df)}] Processing record...")
-            
-            # Create member data
-            try:
-                member_data = create_member_data(row)
-                member_id = member_data.get('id', 'NO_ID')
-                
-                print(f"   Member ID: {member_id}")
-                
-                # Validate data
-                is_valid, validation_msg = validate_member_data(member_data)
-                if not is_valid:
-                    print(f"   ❌ Validation Error: {validation_msg}")
-                    
-                    # Add to failed records with original data
-                    failed_record = row.to_dict()
-                    failed_record['Error_Type'] = 'Validation Error'
-                    failed_record['Error_Message'] = validation_msg
-                    failed_record['Member_ID'] = member_id
-                    failed_record['Row_Number'] = record_num
-                    failed_record['Processed_Data'] = json.dumps(member_data, default=str)
-                    failed_records.append(failed_record)
-                    
-                    error_count += 1
-                    continue
-                
-                # Upload member
-                success, result = upload_member(member_data)
-                
-                if success:
-                    print(f"   ✅ SUCCESS: Record uploaded")
-                    success_count += 1
-                        
-                else:
-                    print(f"   ❌ Upload Error: {str(result)[:100]}...")
-                    
-                    # Add to failed records with original data
-                    failed_record = row.to_dict()
-                    failed_record['Error_Type'] = 'Upload Error'
-                    failed_record['Error_Message'] = str(result)
-                    failed_record['Member_ID'] = member_id
-                    failed_record['Row_Number'] = record_num
-                    failed_record['Processed_Data'] = json.dumps(member_data, default=str)
-                    failed_records.append(failed_record)
-                    
-                    error_count += 1
-                    
-            except Exception as e:
-                print(f"   ❌ Processing Exception: {str(e)}")
-                
-                # Add to failed records with original data
-                failed_record = row.to_dict()
-                failed_record['Error_Type'] = 'Processing Exception'
-                failed_record['Error_Message'] = str(e)
-                failed_record['Member_ID'] = 'Could not extract'
-                failed_record['Row_Number'] = record_num
-                failed_record['Processed_Data'] = 'Could not process'
-                failed_records.append(failed_record)
-                
-                error_count += 1
+        total = 0
+        
+        # Rows are read, cleaned and sent a chunk at a time, one request per chunk
+        for chunk in iter_roster_chunks(CSV_FILE_PATH, BULK_BATCH_SIZE):
+            batch, chunk_failures = prepare_batch(chunk, total + 1, expected or total + len(chunk))
+            failed_records.extend(chunk_failures)
+            success_count += upload_batch(batch, failed_records)[1]
+            total += len(chunk)
+        
+        error_count = len(failed_records)
         
         # Save failed records to Excel
         save_failed_records_to_excel(failed_records)
@@ -582,10 +701,10 @@ def upload_all_records():
         print(f"\n{'='*60}")
         print(f"🎯 FINAL SUMMARY")
         print(f"{'='*60}")
-        print(f"📊 Total records processed: {len(df)}")
+        print(f"📊 Total records processed: {total}")
         print(f"✅ Successful uploads: {success_count}")
         print(f"❌ Failed uploads: {error_count}")
-        print(f"📈 Success rate: {(success_count/len(df)*100):.1f}%")
+        print(f"📈 Success rate: {(success_count/total*100) if total else 0:.1f}%")
         
         if failed_records:
             print(f"\n📋 Failed records have been saved to '{ERROR_LOG_FILE}'")
@@ -609,9 +728,165 @@ def upload_all_records():
         import traceback
         traceback.print_exc()
 
+class ImportCheckpoint:
+    """
+    Tracks which source rows the API has acknowledged so a crashed import can resume.
+
+    Batches finish out of order, so the file keeps a watermark (every row up to
+    it is done) plus the finished row ranges past it. Failures from acknowledged
+    batches are kept too, so the final error log still covers the whole file.
+    """
+
+    def __init__(self, path: str, source: str, batch_size: int):
+        self.path = path
+        self.source = source
+        self.batch_size = batch_size
+        self.last_row = 0
+        self.done_ranges = []
+        self.failed_records = []
+        self.success_count = 0
+        self._lock = threading.Lock()
+
+    def load(self):
+        if not os.path.exists(self.path):
+            return
+        with open(self.path) as f:
+            data = json.load(f)
+        if data.get("source") != self.source:
+            print(f"⚠️  Ignoring checkpoint for a different file: {data.get('source')}")
+            return
+        # Row ranges only line up with the batch size they were recorded with
+        self.batch_size = data["batch_size"]
+        self.last_row = data["last_row"]
+        self.done_ranges = [tuple(r) for r in data["done_ranges"]]
+        self.failed_records = data["failed_records"]
+        self.success_count = data["success_count"]
+
+    def is_done(self, first_row: int, last_row: int) -> bool:
+        return last_row <= self.last_row or (first_row, last_row) in self.done_ranges
+
+    def acknowledge(self, first_row: int, last_row: int, inserted: int, failed_records: list):
+        with self._lock:
+            self.done_ranges.append((first_row, last_row))
+            self.success_count += inserted
+            self.failed_records.extend(failed_records)
+            # Advance the watermark over contiguous finished ranges
+            self.done_ranges.sort()
+            while self.done_ranges and self.done_ranges[0][0] == self.last_row + 1:
+                self.last_row = self.done_ranges.pop(0)[1]
+            self._save()
+
+    def _save(self):
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump({
+                "source": self.source,
+                "batch_size": self.batch_size,
+                "last_row": self.last_row,
+                "done_ranges": self.done_ranges,
+                "failed_records": self.failed_records,
+                "success_count": self.success_count,
+            }, f, default=str)
+        # Atomic replace, a crash mid-write never leaves a truncated checkpoint
+        os.replace(tmp_path, self.path)
+
+    def clear(self):
+        if os.path.exists(self.path):
+            os.remove(self.path)
+
+def upload_all_records_parallel(workers: int = IMPORT_CONCURRENCY, batch_size: int = BULK_BATCH_SIZE, resume: bool = True):
+    """Upload ALL records with concurrent batches, a pooled session and a resumable checkpoint"""
+    try:
+        expected = roster_row_count(CSV_FILE_PATH)
+
+        checkpoint = ImportCheckpoint(CHECKPOINT_FILE, CSV_FILE_PATH, batch_size)
+        if resume:
+            checkpoint.load()
+            batch_size = checkpoint.batch_size
+        else:
+            checkpoint.clear()
+        get_session(pool_size=workers)
+
+        print(f"\n🚀 PARALLEL IMPORT: {expected if expected is not None else 'unknown number of'} records, {workers} workers, batches of {batch_size}")
+        if checkpoint.last_row or checkpoint.done_ranges:
+            print(f"   ↩️  Resuming after row {checkpoint.last_row} ({len(checkpoint.done_ranges)} later batches already done)")
+
+        unacknowledged_failures = []
+        rows_sent = 0
+        started = time.perf_counter()
+
+        def process(first_row: int, last_row: int, chunk):
+            batch, failures = prepare_batch(chunk, first_row, expected or last_row)
+            acknowledged, inserted = upload_batch(batch, failures)
+            return first_row, last_row, acknowledged, inserted, failures
+
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            pending = set()
+
+            def collect(done):
+                nonlocal rows_sent
+                for future in done:
+                    first_row, last_row, acknowledged, inserted, failures = future.result()
+                    if acknowledged:
+                        checkpoint.acknowledge(first_row, last_row, inserted, failures)
+                    else:
+                        # Left out of the checkpoint, --resume sends this batch again
+                        unacknowledged_failures.extend(failures)
+                    rows_sent += last_row - first_row + 1
+                    elapsed = time.perf_counter() - started
+                    print(f"   ⏱️  Rows {first_row}-{last_row} done, {rows_sent / elapsed:.1f} rows/s")
+
+            total = 0
+            # Chunks are read lazily, so at most workers * 2 of them are in memory at once
+            for chunk in iter_roster_chunks(CSV_FILE_PATH, batch_size):
+                first_row, last_row = total + 1, total + len(chunk)
+                total = last_row
+                if checkpoint.is_done(first_row, last_row):
+                    continue
+                if len(pending) >= workers * 2:
+                    done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                    collect(done)
+                pending.add(executor.submit(process, first_row, last_row, chunk))
+
+            collect(wait(pending).done)
+
+        elapsed = time.perf_counter() - started
+        failed_records = checkpoint.failed_records + unacknowledged_failures
+        save_failed_records_to_excel(failed_records)
+
+        print(f"\n{'='*60}")
+        print(f"🎯 FINAL SUMMARY")
+        print(f"{'='*60}")
+        print(f"📊 Total records: {total}")
+        print(f"✅ Successful uploads: {checkpoint.success_count}")
+        print(f"❌ Failed uploads: {len(failed_records)}")
+        print(f"⚡ Throughput: {rows_sent / elapsed if elapsed else 0:.1f} rows/s ({rows_sent} rows in {elapsed:.1f}s)")
+
+        if unacknowledged_failures:
+            print(f"\n🔁 Some batches were not acknowledged, run --parallel again to retry just those")
+        else:
+            checkpoint.clear()
+
+        print(f"\n{'='*60}")
+
+    except Exception as e:
+        print(f"Error in upload_all_records_parallel: {str(e)}")
+        import traceback
+        traceback.print_exc()
+
 if __name__ == "__main__":
-    main()
-    
-    upload_all_records()
+    parser = argparse.ArgumentParser(description="Upload the member roster to the API")
+    parser.add_argument("--parallel", action="store_true", help="Concurrent, resumable batch import")
+    parser.add_argument("--workers", type=int, default=IMPORT_CONCURRENCY)
+    parser.add_argument("--batch-size", type=int, default=BULK_BATCH_SIZE)
+    parser.add_argument("--fresh", action="store_true", help="Ignore any existing checkpoint")
+    args = parser.parse_args()
+
+    if args.parallel:
+        upload_all_records_parallel(args.workers, args.batch_size, resume=not args.fresh)
+    else:
+        main()
+        
+        upload_all_records()
 
 